@@ -2,8 +2,126 @@
 
 import numpy as np
 import array
+import collections
 
-def option_price_call_american_binomial(S, K, r, sigma, t, steps): 
+import BlackScholes
+import BaroneAdesiWhaley
+
+Greeks = collections.namedtuple('Greeks', ['price', 'delta', 'gamma', 'theta', 'vega'])
+
+METHODS = ('crr', 'lr', 'bbs', 'bbsr', 'baw')
+DEFAULT_METHOD = 'crr' # used when a pricer is called without method=
+
+def set_default_method(method):
+    """Set the pricing method used by the American pricers when none is given.
+    @param method: one of METHODS, e.g. 'baw' for the analytic fast path
+    """
+    global DEFAULT_METHOD
+    if (method not in METHODS):
+        raise ValueError("unknown tree method '%s', expected one of %s" % (method, METHODS))
+    DEFAULT_METHOD = method
+
+def _peizer_pratt(z, n):
+    """Peizer-Pratt (method 2) inversion of the normal cdf used by Leisen-Reimer trees"""
+    x = z/(n+1.0/3.0+0.1/(n+1.0))
+    return 0.5+np.sign(z)*0.5*np.sqrt(1.0-np.exp(-x*x*(n+1.0/6.0)))
+
+def _american_binomial(S, K, r, sigma, t, steps, call, levels=0, method=None):
+    """Backward induction through a binomial lattice, one whole time step at a time.
+    Replaces the per-node inner loop of the original Odegaard code with array
+    operations on the vector of node values.
+    S, K, r, sigma and t may also be arrays (broadcast against each other); the
+    node values then form a 2-D (option x node) matrix rolled back in one pass.
+    The underlying lattice is only built once when S, r, sigma and t are scalars.
+    Tree schemes ('method'):
+      crr:  Cox-Ross-Rubinstein
+      lr:   Leisen-Reimer, steps rounded up to an odd number
+      bbs:  CRR with Black-Scholes values at the penultimate step
+      bbsr: bbs with two-point Richardson extrapolation, 2*bbs(steps)-bbs(steps/2)
+      baw:  Barone-Adesi Whaley closed form approximation, no lattice (steps ignored)
+    @param S: spot (underlying) price
+    @param K: strike (exercise) price,
+    @param r: interest rate
+    @param sigma: volatility 
+    @param t: time to maturity 
+    @param steps: Number of steps in binomial tree
+    @param call: True for a call, False for a put
+    @param levels: if > 0, return the node values of the first 'levels' steps
+    @param method: tree scheme, one of METHODS, DEFAULT_METHOD if None
+    @return: Option price (array if any input is an array), or the list of node 
+             value arrays (node index first) for steps 0..levels-1 if levels > 0
+    """
+    if (method is None):
+        method = DEFAULT_METHOD
+    if (method not in METHODS):
+        raise ValueError("unknown tree method '%s', expected one of %s" % (method, METHODS))
+    if (method == 'baw'):
+        if (levels > 0):
+            raise ValueError("no lattice levels with method 'baw'")
+        if call:
+            return BaroneAdesiWhaley.option_price_call_american_baw(S, K, r, sigma, t)
+        return BaroneAdesiWhaley.option_price_put_american_baw(S, K, r, sigma, t)
+    if (method == 'bbsr'):
+        return (2.0*_american_binomial(S, K, r, sigma, t, steps, call, method='bbs')
+                - _american_binomial(S, K, r, sigma, t, max(steps//2, 1), call, method='bbs'))
+    if (method == 'lr'):
+        steps += 1 - steps % 2
+
+    S, K, r, sigma, t = [np.asarray(x, dtype=float) for x in (S, K, r, sigma, t)]
+    R = np.exp(r*(t/steps)) # interest rate for each step
+    Rinv = 1.0/R # inverse of interest rate
+    if (method == 'lr'):
+        sigma_sqrt = sigma*np.sqrt(t)
+        d2 = (np.log(S/K)+r*t)/sigma_sqrt - 0.5*sigma_sqrt
+        p_up = _peizer_pratt(d2, steps)
+        u = R*_peizer_pratt(d2+sigma_sqrt, steps)/p_up # up movement
+        d = (R-p_up*u)/(1.0-p_up)
+    else:
+        u = np.exp(sigma*np.sqrt(t/steps)) # up movement
+        d = 1.0/u
+        p_up = (R-d)/(u-d)
+    p_down = 1.0-p_up
+    sign = 1.0 if call else -1.0 # payoff is max(0, sign*(price-K))
+    # the node index runs along the first axis, so the nodes of a step are a contiguous block
+    ndim = np.broadcast(S, K, r, sigma, t).nd
+    j = np.arange(0, steps+1, dtype=float).reshape((-1,) + (1,)*ndim)
+    prices = S*np.power(u, j)*np.power(d, steps-j) # end nodes
+    values = np.maximum(0.0, sign*(prices-K)) # payoffs at maturity
+    first = steps-1
+    if (method == 'bbs'): # replace the last step by the Black-Scholes (European) value
+        prices = prices[1:]/u
+        if call:
+            values = BlackScholes.option_price_call_black_scholes(prices, K, r, sigma, t/steps)
+        else:
+            values = BlackScholes.option_price_put_black_scholes(prices, K, r, sigma, t/steps)
+        values = np.maximum(values, sign*(prices-K))
+        first = steps-2
+        if (first < levels-1):
+            raise ValueError("too few steps for %d lattice levels" % levels)
+    tree = []
+
+    # roll back in place, the nodes of a step are the first step+1 rows of the buffers
+    pu = p_up*Rinv # discounted probabilities
+    pd = p_down*Rinv
+    exercise = np.empty_like(values)
+    for step in xrange(first, -1, -1):
+        v, ex, p = values[:step+1], exercise[:step+1], prices[:step+1]
+        np.multiply(values[1:step+2], pu, out=ex)
+        v *= pd
+        v += ex
+        np.divide(prices[1:step+2], u, out=p)
+        if call:
+            np.subtract(p, K, out=ex)
+        else:
+            np.subtract(K, p, out=ex)
+        np.maximum(v, ex, out=v) # check for exercise
+        if (step < levels):
+            tree.insert(0, v.copy())
+    if (levels > 0):
+        return tree
+    return values[0][()]
+
+def option_price_call_american_binomial(S, K, r, sigma, t, steps, method=None): 
     """American Option (Call) using binomial approximations
     Converted to Python from "Financial Numerical Recipes in C" by:
     Bernt Arne Odegaard
@@ -14,34 +132,13 @@ def option_price_call_american_binomial(S, K, r, sigma, t, steps):
     @param sigma: volatility 
     @param t: time to maturity 
     @param steps: Number of steps in binomial tree
+    @param method: one of METHODS ('crr', 'lr', 'bbs', 'bbsr', 'baw'), DEFAULT_METHOD if None
     @return: Option price
     """
-    R = np.exp(r*(t/steps))
-    Rinv = 1.0/R
-    u = np.exp(sigma*np.sqrt(t/steps)) 
-    d = 1.0/u
-    p_up = (R-d)/(u-d)
-    p_down = 1.0-p_up
-    prices = array.array('d', (0 for i in range(0,steps+1))) # price of underlying
-    prices[0] = S*pow(d, steps) # fill in the endnodes.
-    uu = u*u
+    return _american_binomial(S, K, r, sigma, t, steps, True, method=method)
 
-    for i in xrange(1, steps+1):
-        prices[i] = uu*prices[i-1]
 
-    call_values = array.array('d', (0 for i in range(0,steps+1))) # value of corresponding call
-    for i in xrange(0, steps+1):
-        call_values[i] = max(0.0, (prices[i]-K)) # call payoffs at maturity
-
-    for step in xrange(steps-1, -1, -1):
-        for i in xrange(0, step+1):
-            call_values[i] = (p_up*call_values[i+1]+p_down*call_values[i])*Rinv
-            prices[i] = d*prices[i+1]
-            call_values[i] = max(call_values[i],prices[i]-K) # check for exercise
-    return call_values[0]
-
-
-def option_price_put_american_binomial(S, K, r, sigma, t, steps):
+def option_price_put_american_binomial(S, K, r, sigma, t, steps, method=None):
     """American Option (Put) using binomial approximations
     Converted to Python from "Financial Numerical Recipes in C" by:
     Bernt Arne Odegaard
@@ -52,32 +149,215 @@ def option_price_put_american_binomial(S, K, r, sigma, t, steps):
     @param sigma: volatility 
     @param t: time to maturity 
     @param steps: Number of steps in binomial tree
+    @param method: one of METHODS ('crr', 'lr', 'bbs', 'bbsr', 'baw'), DEFAULT_METHOD if None
     @return: Option price
     """
-    R = np.exp(r*(t/steps)) # interest rate for each step
-    Rinv = 1.0/R # inverse of interest rate
-    u = np.exp(sigma*np.sqrt(t/steps)) # up movement
+    return _american_binomial(S, K, r, sigma, t, steps, False, method=method)
+
+def option_price_call_american_binomial_chain(S, K, r, sigma, t, steps, method=None):
+    """American Options (Call) for a whole chain using binomial approximations.
+    All strikes are rolled back together through a single lattice sweep.
+    @param S: spot (underlying) price, scalar or array
+    @param K: array of strike (exercise) prices
+    @param r: interest rate, scalar or array
+    @param sigma: volatility, scalar or array
+    @param t: time to maturity, scalar or array
+    @param steps: Number of steps in binomial tree
+    @param method: one of METHODS ('crr', 'lr', 'bbs', 'bbsr', 'baw'), DEFAULT_METHOD if None
+    @return: Array of option prices, broadcast shape of the inputs
+    """
+    return np.asarray(_american_binomial(S, K, r, sigma, t, steps, True, method=method))
+
+def option_price_put_american_binomial_chain(S, K, r, sigma, t, steps, method=None):
+    """American Options (Put) for a whole chain using binomial approximations.
+    All strikes are rolled back together through a single lattice sweep.
+    @param S: spot (underlying) price, scalar or array
+    @param K: array of strike (exercise) prices
+    @param r: interest rate, scalar or array
+    @param sigma: volatility, scalar or array
+    @param t: time to maturity, scalar or array
+    @param steps: Number of steps in binomial tree
+    @param method: one of METHODS ('crr', 'lr', 'bbs', 'bbsr', 'baw'), DEFAULT_METHOD if None
+    @return: Array of option prices, broadcast shape of the inputs
+    """
+    return np.asarray(_american_binomial(S, K, r, sigma, t, steps, False, method=method))
+
+def _american_partials_binomial(S, K, r, sigma, t, steps, call, vega_diff=0.01):
+    """Price and partial derivatives read from the first levels of the lattice.
+    Delta, gamma and theta come from the nodes of steps 0-2 of the pricing pass, 
+    vega from the sigma-/+vega_diff lattices rolled back in the same sweep.
+    @return: Greeks(price, delta, gamma, theta, vega)
+    """
+    S, K, r, sigma, t = [np.asarray(x, dtype=float) for x in (S, K, r, sigma, t)]
+    shape = np.broadcast(S, K, r, sigma, t).shape
+    sigma = sigma*np.ones(shape)
+    if ((sigma <= 0).any()):
+        raise ValueError("volatility must be positive")
+    lower = np.maximum(sigma-vega_diff, 0.5*sigma) # keep the bumped lattice valid for small sigma
+    upper = sigma+vega_diff
+    sigmas = np.array([sigma, lower, upper]) # paired sigma sweep
+    f0, f1, f2 = _american_binomial(S, K, r, sigmas, t, steps, call, levels=3, method='crr')
+    delta_t = t/steps
+    u = np.exp(sigma*np.sqrt(delta_t))
     uu = u*u
     d = 1.0/u
-    p_up = (R-d)/(u-d)
-    p_down = 1.0-p_up
-    prices = array.array('d', (0 for i in range(0,steps+1))) # price of underlying
-    prices[0] = S*pow(d, steps) 
+    f00 = f0[0][0] # [node][sigma]
+    f10, f11 = f1[0][0], f1[1][0]
+    f20, f21, f22 = f2[0][0], f2[1][0], f2[2][0]
+    delta = (f11-f10)/(S*u-S*d)
+    h = 0.5*S*(uu-d*d)
+    gamma = ((f22-f21)/(S*(uu-1.0)) - (f21-f20)/(S*(1.0-d*d)))/h
+    theta = (f21-f00)/(2.0*delta_t)
+    vega = (f0[0][2]-f0[0][1])/(upper-lower)
+    return Greeks(f00[()], delta[()], gamma[()], theta[()], vega[()])
+
+def option_price_partials_american_call_binomial(S, K, r, sigma, t, steps):
+    """American Option (Call) price and partial derivatives using binomial approximations
+    Greeks are read from the lattice of a single backward pass, see 
+    "Financial Numerical Recipes in C" by: Bernt Arne Odegaard
+    @param S: spot (underlying) price, scalar or array
+    @param K: strike (exercise) price, scalar or array
+    @param r: interest rate
+    @param sigma: volatility 
+    @param t: time to maturity 
+    @param steps: Number of steps in binomial tree
+    @return: Greeks(price, delta, gamma, theta, vega)
+    """
+    return _american_partials_binomial(S, K, r, sigma, t, steps, True)
+
+def option_price_partials_american_put_binomial(S, K, r, sigma, t, steps):
+    """American Option (Put) price and partial derivatives using binomial approximations
+    Greeks are read from the lattice of a single backward pass, see 
+    "Financial Numerical Recipes in C" by: Bernt Arne Odegaard
+    @param S: spot (underlying) price, scalar or array
+    @param K: strike (exercise) price, scalar or array
+    @param r: interest rate
+    @param sigma: volatility 
+    @param t: time to maturity 
+    @param steps: Number of steps in binomial tree
+    @return: Greeks(price, delta, gamma, theta, vega)
+    """
+    return _american_partials_binomial(S, K, r, sigma, t, steps, False)
+
+def _american_discrete_dividends_binomial(S, K, r, sigma, t, steps, dividend_times, dividend_amounts, call):
+    """Discrete (dollar) dividend lattice shared by the call and put pricers.
+    Given an amount of dividend, the binomial tree does not recombine, have to 
+    start a new tree at each ex-dividend date. The "value_alive" subtrees of all 
+    nodes at an ex-dividend date are solved together in batches (S is carried 
+    as an array through the recursion), instead of one recursive call per node.
+    @param S: spot (underlying) price, scalar or array
+    @param K: strike (exercise) price,
+    @param r: interest rate
+    @param sigma: volatility 
+    @param t: time to maturity 
+    @param steps: Number of steps in binomial tree
+    @param dividend_times: Array of dividend times. (Ex: [0.25, 0.75] for 1/4 and 3/4 of a year)
+    @param dividend_amounts: Array of dividend amounts for the 'dividend_times'
+    @param call: True for a call, False for a put
+    @return: Option price (array if S is an array)
+    """
+    S, K = np.broadcast_arrays(np.asarray(S, dtype=float), np.asarray(K, dtype=float))
+    values = _discrete_dividends_values(S.ravel(), K.ravel(), r, sigma, t, steps,
+                                        list(dividend_times), list(dividend_amounts), call)
+    return values.reshape(S.shape)[()]
+
+DIVIDEND_BLOCK = 1 << 18 # lattice nodes rolled back at once by the discrete dividend pricers
+
+def _discrete_dividends_values(S, K, r, sigma, t, steps, dividend_times, dividend_amounts, call):
+    """_american_discrete_dividends_binomial of 1-D arrays of spots and strikes.
+    The number of subtrees multiplies at every dividend, so the spots are split in
+    blocks whose lattices have at most about DIVIDEND_BLOCK nodes: the memory used
+    is bounded, the work is that of the recursive tree.
+    """
+    block = max(1, DIVIDEND_BLOCK//(steps+1)) # no lattice below has more than steps+1 nodes
+    if (len(S) > block):
+        return np.concatenate([_discrete_dividends_values(S[i:i+block], K[i:i+block], r, sigma, t, steps,
+                                                          dividend_times, dividend_amounts, call)
+                               for i in xrange(0, len(S), block)])
+    no_dividends = len(dividend_times)
+    if (no_dividends == 0): # just take the regular binomial 
+        return np.asarray(_american_binomial(S, K, r, sigma, t, steps, call, method='crr'))
+    steps_before_dividend = (int)(dividend_times[0]/t*steps)
 
-    for i in xrange(1, steps+1):
-        prices[i] = uu*prices[i-1]
+    R = np.exp(r*(t/steps))
+    Rinv = 1.0/R
+    u = np.exp(sigma*np.sqrt(t/steps))
+    d = 1.0/u
+    pUp = (R-d)/(u-d)
+    pDown = 1.0 - pUp
+    sign = 1.0 if call else -1.0
+    tmp_dividend_times = [dt - dividend_times[0] for dt in dividend_times[1:]] # temporaries with 
+    tmp_dividend_amounts = dividend_amounts[1:] # one less dividend 
+
+    prices = S[:, np.newaxis]*np.power(u, np.arange(-steps_before_dividend, steps_before_dividend+1, 2, dtype=float))
+    K = K[:, np.newaxis]
+
+    # what is the value of keeping the option alive?  Found recursively, 
+    # with one less dividend, the stock price is current value 
+    # less the dividend.
+    value_alive = _discrete_dividends_values((prices-dividend_amounts[0]).ravel(), np.repeat(K, prices.shape[1]),
+                                             r, sigma, t-dividend_times[0], # time after first dividend
+                                             steps-steps_before_dividend, 
+                                             tmp_dividend_times, tmp_dividend_amounts, call)
+    values = np.maximum(value_alive.reshape(prices.shape), sign*(prices-K)) # compare to exercising now
 
-    put_values = array.array('d', (0 for i in range(0,steps+1))) # value of corresponding put
+    for step in xrange(steps_before_dividend-1, -1, -1):
+        prices = d*prices[:, 1:]
+        values = (pDown*values[:, :-1]+pUp*values[:, 1:])*Rinv
+        values = np.maximum(values, sign*(prices-K)) # check for exercise
+
+    return values[:, 0]
+
+def _american_escrowed_dividends_binomial(S, K, r, sigma, t, steps, dividend_times, dividend_amounts, call):
+    """Escrowed dividend lattice: a single recombining CRR tree on the spot less 
+    the present value of the dividends, with the outstanding dividends added back 
+    at each node when checking for exercise. Dividends are paid at the same tree 
+    steps as in the discrete dividend (recursive) pricers. The volatility of the 
+    escrowed spot is scaled up by S/(S-PV(dividends still to be paid)) over each 
+    inter-dividend period, so that it stays close to the recursive pricers.
+    @param S: spot (underlying) price
+    @param K: strike (exercise) price,
+    @param r: interest rate
+    @param sigma: volatility 
+    @param t: time to maturity 
+    @param steps: Number of steps in binomial tree
+    @param dividend_times: Array of dividend times. (Ex: [0.25, 0.75] for 1/4 and 3/4 of a year)
+    @param dividend_amounts: Array of dividend amounts for the 'dividend_times'
+    @param call: True for a call, False for a put
+    @return: Option price
+    """
+    pv = [a*np.exp(-r*dt) for (dt, a) in zip(dividend_times, dividend_amounts)]
+    edges = [0.0] + list(dividend_times) + [t]
+    variance = 0.0
+    for i in xrange(0, len(edges)-1): # average the adjusted variance over the periods
+        scale = S/(S-sum(pv[i:]))
+        variance += sigma*sigma*scale*scale*(edges[i+1]-edges[i])
+    sigma = np.sqrt(variance/t)
+
+    delta_t = t/steps
+    R = np.exp(r*delta_t)
+    Rinv = 1.0/R
+    u = np.exp(sigma*np.sqrt(delta_t))
+    d = 1.0/u
+    pUp = (R-d)/(u-d)
+    pDown = 1.0 - pUp
+    sign = 1.0 if call else -1.0
+    dividend_steps = np.array([(int)(dt/t*steps) for dt in dividend_times], dtype=int)
+    dividend_amounts = np.asarray(dividend_amounts, dtype=float)
 
-    for i in xrange(0, steps+1):
-        put_values[i] = max(0.0, (K-prices[i])) # put payoffs at maturity
+    def escrow(step): # value at 'step' of the dividends still to be paid
+        left = dividend_steps >= step
+        return np.sum(dividend_amounts[left]*np.power(Rinv, dividend_steps[left]-step))
+
+    prices = (S-escrow(0))*np.power(u, np.arange(-steps, steps+1, 2, dtype=float)) # escrowed end nodes
+    values = np.maximum(0.0, sign*(prices+escrow(steps)-K))
 
     for step in xrange(steps-1, -1, -1):
-        for i in xrange(0, step+1):
-            put_values[i] = (p_up*put_values[i+1]+p_down*put_values[i])*Rinv
-            prices[i] = d*prices[i+1]
-            put_values[i] = max(put_values[i],(K-prices[i])) # check for exercise
-    return put_values[0]
+        prices = d*prices[1:]
+        values = (pDown*values[:-1]+pUp*values[1:])*Rinv
+        values = np.maximum(values, sign*(prices+escrow(step)-K)) # check for exercise
+
+    return values[0]
 
 def option_price_call_american_discrete_dividends_binomial(S, K, r, sigma, t, steps, dividend_times, dividend_amounts):
     """American Option (Call) for dividends with specific (discrete) dollar amounts 
@@ -95,45 +375,7 @@ def option_price_call_american_discrete_dividends_binomial(S, K, r, sigma, t, st
     @param dividend_amounts: Array of dividend amounts for the 'dividend_times'
     @return: Option price
     """
-    no_dividends = len(dividend_times)
-    if (no_dividends==0): 
-        return option_price_call_american_binomial(S,K,r,sigma,t,steps) # just do regular
-    steps_before_dividend = (int)(dividend_times[0]/t*steps)
-    R = np.exp(r*(t/steps))
-    Rinv = 1.0/R
-    u = np.exp(sigma*np.sqrt(t/steps))
-    d = 1.0/u
-    pUp = (R-d)/(u-d)
-    pDown = 1.0 - pUp
-    dividend_amount = dividend_amounts[0]
-    tmp_dividend_times = array.array('d', (0 for i in range(0,no_dividends-1))) # temporaries with 
-    tmp_dividend_amounts = array.array('d', (0 for i in range(0,no_dividends-1))) # one less dividend 
-    for i in xrange(0, no_dividends-1):
-        tmp_dividend_amounts[i] = dividend_amounts[i+1]
-        tmp_dividend_times[i]   = dividend_times[i+1] - dividend_times[0]
-
-    prices = array.array('d', (0 for i in range(0,steps_before_dividend+1)))
-    call_values = array.array('d', (0 for i in range(0,steps_before_dividend+1)))
-    prices[0] = S*pow(d, steps_before_dividend)
-
-    for i in xrange(1, steps_before_dividend+1):
-        prices[i] = u*u*prices[i-1]
-
-    for i in xrange(0, steps_before_dividend+1):
-        value_alive = option_price_call_american_discrete_dividends_binomial(prices[i]-dividend_amount,K, r, sigma,
-                                     t-dividend_times[0], # time after first dividend
-                                     steps-steps_before_dividend, 
-                                     tmp_dividend_times,
-                                     tmp_dividend_amounts)
-        call_values[i] = max(value_alive,(prices[i]-K)) # compare to exercising now
-
-    for step in xrange(steps_before_dividend-1, -1, -1):
-        for i in xrange(0, step+1):
-            prices[i] = d*prices[i+1]
-            call_values[i] = (pDown*call_values[i]+pUp*call_values[i+1])*Rinv
-            call_values[i] = max(call_values[i], prices[i]-K)
-
-    return call_values[0]
+    return _american_discrete_dividends_binomial(S, K, r, sigma, t, steps, dividend_times, dividend_amounts, True)
 
 
 def option_price_put_american_discrete_dividends_binomial(S, K, r, sigma, t, steps, dividend_times, dividend_amounts): 
@@ -152,58 +394,43 @@ def option_price_put_american_discrete_dividends_binomial(S, K, r, sigma, t, ste
     @param dividend_amounts: Array of dividend amounts for the 'dividend_times'
     @return: Option price
     """
+    return _american_discrete_dividends_binomial(S, K, r, sigma, t, steps, dividend_times, dividend_amounts, False)
 
-    # given an amount of dividend, the binomial tree does not recombine, have to 
-    # start a new tree at each ex-dividend date.
-    # do this recursively, at each ex dividend date, at each step, put the 
-    # binomial formula starting at that point to calculate the value of the live
-    # option, and compare that to the value of exercising now.
-
-    no_dividends = len(dividend_times)
-    if (no_dividends == 0): # just take the regular binomial 
-        return option_price_put_american_binomial(S,K,r,sigma,t,steps)
-    steps_before_dividend = (int)(dividend_times[0]/t*steps);
 
-    R = np.exp(r*(t/steps))
-    Rinv = 1.0/R
-    u = np.exp(sigma*np.sqrt(t/steps))
-    uu= u*u
-    d = 1.0/u
-    pUp = (R-d)/(u-d)
-    pDown = 1.0 - pUp
-    dividend_amount = dividend_amounts[0]
-
-    tmp_dividend_times = array.array('d', (0 for i in range(0,no_dividends-1))) # temporaries with 
-    tmp_dividend_amounts = array.array('d', (0 for i in range(0,no_dividends-1))) # one less dividend 
-    for i in xrange(0, no_dividends-1): 
-        tmp_dividend_amounts[i] = dividend_amounts[i+1]
-        tmp_dividend_times[i]= dividend_times[i+1] - dividend_times[0]
-
-    prices = array.array('d', (0 for i in range(0,steps_before_dividend+1)))
-    put_values = array.array('d', (0 for i in range(0,steps_before_dividend+1)))
-    prices[0] = S*pow(d, steps_before_dividend)
-
-    for i in xrange(1, steps_before_dividend+1):
-        prices[i] = uu*prices[i-1]
-
-    for i in xrange(0, steps_before_dividend+1):
-        value_alive = option_price_put_american_discrete_dividends_binomial(
-                    prices[i]-dividend_amount, K, r, sigma, 
-                    t-dividend_times[0], # time after first dividend
-                    steps-steps_before_dividend, 
-                    tmp_dividend_times, tmp_dividend_amounts)  
-        # what is the value of keeping the option alive?  Found recursively, 
-        # with one less dividend, the stock price is current value 
-        # less the dividend.
-        put_values[i] = max(value_alive,(K-prices[i])) # compare to exercising now
+def option_price_call_american_escrowed_dividends_binomial(S, K, r, sigma, t, steps, dividend_times, dividend_amounts):
+    """American Option (Call) for dividends with specific (discrete) dollar amounts 
+    using an escrowed dividend binomial approximation. The tree recombines, so the 
+    cost is that of a single lattice whatever the number of dividends; 
+    option_price_call_american_discrete_dividends_binomial is the reference.
+    @param S: spot (underlying) price
+    @param K: strike (exercise) price,
+    @param r: interest rate
+    @param sigma: volatility 
+    @param t: time to maturity 
+    @param steps: Number of steps in binomial tree
+    @param dividend_times: Array of dividend times. (Ex: [0.25, 0.75] for 1/4 and 3/4 of a year)
+    @param dividend_amounts: Array of dividend amounts for the 'dividend_times'
+    @return: Option price
+    """
+    return _american_escrowed_dividends_binomial(S, K, r, sigma, t, steps, dividend_times, dividend_amounts, True)
 
-    for step in xrange(steps_before_dividend-1, -1, -1):
-        for i in xrange(0, step+1):
-            prices[i] = d*prices[i+1]
-            put_values[i] = (pDown*put_values[i]+pUp*put_values[i+1])*Rinv
-            put_values[i] = max(put_values[i], K-prices[i]) # check for exercise
 
-    return put_values[0]
+def option_price_put_american_escrowed_dividends_binomial(S, K, r, sigma, t, steps, dividend_times, dividend_amounts):
+    """American Option (Put) for dividends with specific (discrete) dollar amounts 
+    using an escrowed dividend binomial approximation. The tree recombines, so the 
+    cost is that of a single lattice whatever the number of dividends; 
+    option_price_put_american_discrete_dividends_binomial is the reference.
+    @param S: spot (underlying) price
+    @param K: strike (exercise) price,
+    @param r: interest rate
+    @param sigma: volatility 
+    @param t: time to maturity 
+    @param steps: Number of steps in binomial tree
+    @param dividend_times: Array of dividend times. (Ex: [0.25, 0.75] for 1/4 and 3/4 of a year)
+    @param dividend_amounts: Array of dividend amounts for the 'dividend_times'
+    @return: Option price
+    """
+    return _american_escrowed_dividends_binomial(S, K, r, sigma, t, steps, dividend_times, dividend_amounts, False)
 
 
 def option_price_call_american_proportional_dividends_binomial(S, K, r, sigma, 
@@ -226,7 +453,7 @@ def option_price_call_american_proportional_dividends_binomial(S, K, r, sigma,
     # note that the last dividend date should be before the expiry date, problems if dividend at terminal node
     no_dividends=len(dividend_times)
     if (no_dividends == 0):
-        return option_price_call_american_binomial(S,K,r,sigma,time,no_steps) # price w/o dividends
+        return option_price_call_american_binomial(S,K,r,sigma,time,no_steps, method='crr') # price w/o dividends
 
     delta_t = time/no_steps
     R = np.exp(r*delta_t)
@@ -289,7 +516,7 @@ def option_price_put_american_proportional_dividends_binomial(S, K, r, sigma,
     # note that the last dividend date should be before the expiry date
     no_dividends=len(dividend_times);
     if (no_dividends == 0): # just take the regular binomial 
-        return option_price_put_american_binomial(S,K,r,sigma,time,no_steps)
+        return option_price_put_american_binomial(S,K,r,sigma,time,no_steps, method='crr')
 
     R = np.exp(r*(time/no_steps))
     Rinv = 1.0/R
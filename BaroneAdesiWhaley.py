@@ -0,0 +1,92 @@
+#!/usr/bin/python
+
+# Barone-Adesi and Whaley (1987) quadratic approximation of American options.
+# Same signature as the Amop binomial pricers (steps is ignored), vectorized
+# over arrays of inputs.
+
+import numpy as np
+from scipy.special import ndtr as N # cumulative normal, vectorized
+
+import BlackScholes
+
+def _n(x): # normal density
+    return np.exp(-0.5*x*x)/np.sqrt(2.0*np.pi)
+
+def _critical_price_put(K, r, sigma, t, q1, tolerance=1e-8, max_iter=50):
+    """Critical spot below which the American put is exercised, found by Newton
+    iterations. Options drop out of the iteration as they converge.
+    """
+    M = 2.0*r/(sigma*sigma)
+    q1u = -0.5*((M-1.0)+np.sqrt((M-1.0)**2+4.0*M)) # q1 for infinite maturity
+    su = K/(1.0-1.0/q1u)
+    h1 = (r*t-2.0*sigma*np.sqrt(t))*K/(K-su)
+    Sk = su+(K-su)*np.exp(h1) # seed
+    shape = Sk.shape
+    K, r, sigma, t, q1, Sk = [np.ravel(x) for x in (K, r, sigma, t, q1, Sk)]
+    sigma_sqrt = sigma*np.sqrt(t)
+    discount = K*np.exp(-r*t)
+    drift = (r+0.5*sigma*sigma)*t
+    active = np.arange(Sk.size)
+    for i in xrange(0, max_iter):
+        Si = Sk[active]
+        Ka, qa, sa = K[active], q1[active], sigma_sqrt[active]
+        d1 = (np.log(Si/Ka)+drift[active])/sa
+        Nd1 = N(-d1)
+        put = discount[active]*N(sa-d1) - Si*Nd1 # European put at Si
+        RHS = put - (1.0-Nd1)*Si/qa
+        unsettled = np.abs(Ka-Si-RHS)/Ka >= tolerance
+        if (not unsettled.any()):
+            break
+        bi = -Nd1*(1.0-1.0/qa) - (1.0+_n(-d1)/sa)/qa
+        active = active[unsettled]
+        Sk[active] = ((Ka-RHS+bi*Si)/(1.0+bi))[unsettled]
+    return Sk.reshape(shape)
+
+def option_price_call_american_baw(S, K, r, sigma, t, steps=None):
+    """American Option (Call) using the Barone-Adesi Whaley approximation.
+    Without dividends early exercise of a call is never optimal, so this is the
+    Black-Scholes value.
+    @param S: spot (underlying) price
+    @param K: strike (exercise) price,
+    @param r: interest rate
+    @param sigma: volatility
+    @param t: time to maturity
+    @param steps: ignored, for compatibility with the binomial pricers
+    @return: Option price (array if any input is an array)
+    """
+    S, K, r, sigma, t = [np.asarray(x, dtype=float) for x in (S, K, r, sigma, t)]
+    return BlackScholes.option_price_call_black_scholes(S, K, r, sigma, t)[()]
+
+def option_price_put_american_baw(S, K, r, sigma, t, steps=None):
+    """American Option (Put) using the Barone-Adesi Whaley approximation.
+    @param S: spot (underlying) price
+    @param K: strike (exercise) price,
+    @param r: interest rate
+    @param sigma: volatility
+    @param t: time to maturity
+    @param steps: ignored, for compatibility with the binomial pricers
+    @return: Option price (array if any input is an array)
+    """
+    S, K, r, sigma, t = np.broadcast_arrays(*[np.asarray(x, dtype=float) for x in (S, K, r, sigma, t)])
+    european = BlackScholes.option_price_put_black_scholes(S, K, r, sigma, t)
+    premium = r > 0 # with r <= 0 early exercise is never optimal, the put is European
+    rp = np.where(premium, r, 1.0) # any positive rate, the result is not used
+    M = 2.0*rp/(sigma*sigma)
+    K_ = 1.0-np.exp(-rp*t)
+    q1 = -0.5*((M-1.0)+np.sqrt((M-1.0)**2+4.0*M/K_))
+    Sk = _critical_price_put(K, rp, sigma, t, q1)
+    d1 = (np.log(Sk/K)+(rp+0.5*sigma*sigma)*t)/(sigma*np.sqrt(t))
+    A1 = -(Sk/q1)*(1.0-N(-d1))
+    with np.errstate(invalid='ignore'):
+        value = np.where(S > Sk, european+A1*np.power(S/Sk, q1), K-S)
+    return np.where(premium, value, european)[()]
+
+
+if __name__ == '__main__':
+    S = 100.0
+    K = 100.0
+    r = 0.10
+    sigma = 0.25
+    time = 1.0
+    print "BAW American call price =", option_price_call_american_baw(S, K, r, sigma, time)
+    print "BAW American put price =", option_price_put_american_baw(S, K, r, sigma, time)
@@ -0,0 +1,119 @@
+#!/usr/bin/python
+
+import numpy as np
+from scipy.special import ndtr as N # cumulative normal, vectorized
+
+def _d1_d2(S, K, r, sigma, time):
+    time_sqrt = np.sqrt(time)
+    d1 = (np.log(S/K)+r*time)/(sigma*time_sqrt) + 0.5*sigma*time_sqrt
+    d2 = d1-(sigma*time_sqrt)
+    return d1, d2
+
+def option_price_call_black_scholes(S, K, r, sigma, time):
+    """European Option (Call) using the Black Scholes formula
+    Converted to Python from "Financial Numerical Recipes in C" by:
+    Bernt Arne Odegaard
+    http://finance.bi.no/~bernt/gcc_prog/index.html
+    All arguments may be arrays (broadcast against each other).
+    @param S: spot (underlying) price
+    @param K: strike (exercise) price,
+    @param r: interest rate
+    @param sigma: volatility
+    @param time: time to maturity
+    @return: Option price
+    """
+    d1, d2 = _d1_d2(S, K, r, sigma, time)
+    return S*N(d1) - K*np.exp(-r*time)*N(d2)
+
+def option_price_put_black_scholes(S, K, r, sigma, time):
+    """European Option (Put) using the Black Scholes formula
+    Converted to Python from "Financial Numerical Recipes in C" by:
+    Bernt Arne Odegaard
+    http://finance.bi.no/~bernt/gcc_prog/index.html
+    All arguments may be arrays (broadcast against each other).
+    @param S: spot (underlying) price
+    @param K: strike (exercise) price,
+    @param r: interest rate
+    @param sigma: volatility
+    @param time: time to maturity
+    @return: Option price
+    """
+    d1, d2 = _d1_d2(S, K, r, sigma, time)
+    return K*np.exp(-r*time)*N(-d2) - S*N(-d1)
+
+def option_vega_black_scholes(S, K, r, sigma, time):
+    """Vega of a European Option (Call or Put) using the Black Scholes formula
+    All arguments may be arrays (broadcast against each other).
+    @param S: spot (underlying) price
+    @param K: strike (exercise) price,
+    @param r: interest rate
+    @param sigma: volatility
+    @param time: time to maturity
+    @return: Option vega, d(price)/d(sigma)
+    """
+    d1, d2 = _d1_d2(S, K, r, sigma, time)
+    return S*np.sqrt(time)*np.exp(-0.5*d1*d1)/np.sqrt(2.0*np.pi)
+
+def option_implied_volatility_black_scholes(price, S, K, r, time, call=True, tolerance=1e-10, max_iter=50):
+    """Implied volatility of European Options, inverting the Black Scholes formula.
+    The out of the money side is inverted (puts through put-call parity), starting 
+    from the Corrado-Miller approximation and taking Newton steps safeguarded by 
+    bisection on a bracket. Options drop out of the iteration as they converge.
+    All arguments but tolerance and max_iter may be arrays (broadcast against each other).
+    @param price: option price
+    @param S: spot (underlying) price
+    @param K: strike (exercise) price,
+    @param r: interest rate
+    @param time: time to maturity
+    @param call: True for calls, False for puts
+    @return: volatility, NaN where the price is outside the no-arbitrage bounds
+    """
+    price, S, K, r, time, call = np.broadcast_arrays(*[np.asarray(x, dtype=float) for x in (price, S, K, r, time, call)])
+    shape = price.shape
+    price, S, K, r, time, call = [np.ravel(x) for x in (price, S, K, r, time, call)]
+    X = K*np.exp(-r*time) # discounted strike
+    otm_call = X >= S
+    price = np.where(call > 0, price, price+S-X) # as a call, by put-call parity
+    lower = np.maximum(0.0, S-X)
+    with np.errstate(invalid='ignore'): # NaN prices are invalid
+        valid = (price > lower) & (price < S)
+    price = np.where(otm_call, price, price-S+X) # back out to the otm side
+    with np.errstate(divide='ignore', invalid='ignore'):
+        c = np.where(otm_call, price, price+S-X)-0.5*(S-X)
+        root = np.sqrt(np.maximum(0.0, c*c-(S-X)**2/np.pi))
+        sigma = np.sqrt(2.0*np.pi/time)/(S+X)*(c+root) # Corrado-Miller
+        sigma = np.where(np.isfinite(sigma) & (sigma > 1e-3), np.minimum(sigma, 5.0),
+                         np.sqrt(2.0*np.abs(np.log(S/K)+r*time)/time)+1e-3)
+    lo = np.zeros(price.size)
+    hi = np.full(price.size, 10.0)
+    active = np.flatnonzero(valid)
+    for i in xrange(0, max_iter):
+        if (active.size == 0):
+            break
+        s, a = sigma[active], active
+        value = np.where(otm_call[a], option_price_call_black_scholes(S[a], K[a], r[a], s, time[a]),
+                         option_price_put_black_scholes(S[a], K[a], r[a], s, time[a]))
+        error = value-price[a]
+        vega = option_vega_black_scholes(S[a], K[a], r[a], s, time[a])
+        above = error > 0
+        hi[a] = np.where(above, s, hi[a])
+        lo[a] = np.where(above, lo[a], s)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = s-error/vega
+        inside = (step > lo[a]) & (step < hi[a])
+        sigma[a] = np.where(inside, step, 0.5*(lo[a]+hi[a]))
+        active = a[(np.abs(sigma[a]-s) > tolerance) & (hi[a]-lo[a] > tolerance)]
+    return np.where(valid, sigma, np.nan).reshape(shape)[()]
+
+
+if __name__ == '__main__':
+    S = 50.0
+    K = 50.0
+    r = 0.10
+    sigma = 0.30
+    time = 0.50
+    print "Black Scholes call price =", option_price_call_black_scholes(S, K, r, sigma, time)
+    print "Black Scholes put price =", option_price_put_black_scholes(S, K, r, sigma, time)
+    print "Black Scholes vega =", option_vega_black_scholes(S, K, r, sigma, time)
+    print "Black Scholes implied volatility =", option_implied_volatility_black_scholes(
+        option_price_put_black_scholes(S, K, r, sigma, time), S, K, r, time, call=False)
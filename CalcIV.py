@@ -2,12 +2,31 @@
 
 import numpy as np
 import scipy.optimize
+import collections
 
 import Amop
+import BlackScholes
+import BaroneAdesiWhaley
+import OptionChain
+
+SOLVERS = ('fmin', 'newton', 'brent', 'european')
 
 class IV:
 
-    def __init__(self, S, K, Cb, Ca, Pb, Pa, rate, time, amop_steps=100, opt_iter=1000, disp=False, full_output=False):
+    def __init__(self, S, K, Cb, Ca, Pb, Pa, rate, time, amop_steps=100, opt_iter=1000, disp=False, full_output=False, cache=None,
+                 solver='fmin', price_tol=1e-4, vol_bounds=(1e-4, 5.0), sigma0=None, premium_tol=0.01):
+        """
+        solver: 'fmin' (Nelder-Mead on the squared error), 'newton' (Gauss-Newton on the
+                same squared error using the lattice vega, safeguarded by bisection) or
+                'brent' (scipy brentq on its gradient) or 'european' (iv_chain_european:
+                analytic European IV plus an early exercise premium estimate, falling
+                back to the tree when the premium is above premium_tol)
+        price_tol: 'newton' and 'brent' stop once the vega weighted price error is below this
+        vol_bounds: volatility bracket searched by 'newton' and 'brent'
+        sigma0: starting volatility, e.g. the previous solve of this contract or 
+                of its neighbouring strike (0.1 if None)
+        premium_tol: largest early exercise premium 'european' trusts to the estimate
+        """
         self.S = S
         self.K = K
         self.Cmp = 0.5 * (Cb + Ca)
@@ -16,23 +35,379 @@ class IV:
         self.Ptv = -1
         self.rate = rate
         self.time = time
-        self.sigma = 0.1
+        self.sigma = 0.1 if (sigma0 is None) else sigma0
         self.amop_steps=amop_steps
         self.opt_iter=opt_iter
         self.disp=disp
         self.full_output=full_output
+        self.cache=cache # optional PriceCache.PriceCache shared between solves
+        if (solver not in SOLVERS):
+            raise ValueError("unknown solver '%s', expected one of %s" % (solver, SOLVERS))
+        self.solver=solver
+        self.price_tol=price_tol
+        self.vol_bounds=vol_bounds
+        self.premium_tol=premium_tol
+        self.iterations = 0 # solver report
+        self.converged = False
+        self.reason = None
 
     def cost(self, sigma):
-        self.Ctv = Amop.option_price_call_american_binomial(self.S, self.K, self.rate, sigma, self.time, self.amop_steps) if (self.Cmp > 0 ) else 0
-        self.Ptv = Amop.option_price_put_american_binomial(self.S, self.K, self.rate, sigma, self.time, self.amop_steps) if (self.Pmp > 0) else 0
+        call = Amop.option_price_call_american_binomial
+        put = Amop.option_price_put_american_binomial
+        if (self.cache is not None):
+            call, put = self.cache.wrap(call), self.cache.wrap(put)
+        sigma = float(np.ravel(sigma)[0]) # fmin passes a 1 element array
+        self.Ctv = call(self.S, self.K, self.rate, sigma, self.time, self.amop_steps) if (self.Cmp > 0 ) else 0
+        self.Ptv = put(self.S, self.K, self.rate, sigma, self.time, self.amop_steps) if (self.Pmp > 0) else 0
         cost = (self.Ctv - self.Cmp) ** 2 + (self.Ptv - self.Pmp) ** 2
         return cost
 
+    def gradient(self, sigma):
+        """Gradient of cost/2 and its Gauss-Newton curvature, from the lattice vegas
+        @return: (sum(vega*error), sum(vega**2), sum(error))
+        """
+        g = 0.0
+        H = 0.0
+        e = 0.0
+        self.Ctv = self.Ptv = 0
+        if (self.Cmp > 0):
+            greeks = Amop.option_price_partials_american_call_binomial(self.S, self.K, self.rate, sigma, self.time, self.amop_steps)
+            self.Ctv = greeks.price
+            g += greeks.vega*(greeks.price-self.Cmp)
+            H += greeks.vega*greeks.vega
+            e += greeks.price-self.Cmp
+        if (self.Pmp > 0):
+            greeks = Amop.option_price_partials_american_put_binomial(self.S, self.K, self.rate, sigma, self.time, self.amop_steps)
+            self.Ptv = greeks.price
+            g += greeks.vega*(greeks.price-self.Pmp)
+            H += greeks.vega*greeks.vega
+            e += greeks.price-self.Pmp
+        return g, H, e
+
+    def direction(self, sigma):
+        """sum(vega*error), or the price error where the lattice has no vega
+        (deep in the money), whose sign says on which side of sigma the solution is"""
+        g, H, e = self.gradient(sigma)
+        return g if (H > 1e-12) else e
+
+    def _newton(self):
+        lo, hi = self.vol_bounds
+        sigma = min(max(self.sigma, lo), hi)
+        for i in xrange(1, self.opt_iter+1):
+            self.iterations = i
+            g, H, e = self.gradient(sigma)
+            if (H > 0 and abs(g)/np.sqrt(H) < self.price_tol):
+                self.converged = True
+                break
+            if ((g if H > 1e-12 else e) > 0):
+                hi = sigma
+            else:
+                lo = sigma
+            if (hi-lo < 1e-10):
+                self.reason = "no volatility in %s fits the quotes" % (self.vol_bounds,)
+                break
+            step = sigma-g/H if (H > 0) else np.nan
+            sigma = step if (lo < step < hi) else 0.5*(lo+hi) # bisect when Newton leaves the bracket
+        else:
+            self.reason = "no convergence in %d iterations" % self.opt_iter
+        self.sigma = sigma
+
+    def _brent(self):
+        lo, hi = self.vol_bounds
+        g_lo = self.direction(lo)
+        g_hi = self.direction(hi)
+        self.iterations = 2
+        if (g_lo > 0 or g_hi < 0):
+            self.reason = "no volatility in %s fits the quotes" % (self.vol_bounds,)
+            self.sigma = lo if (g_lo > 0) else hi
+            return
+        g, H, e = self.gradient(min(max(self.sigma, lo), hi)) # price tolerance -> vol tolerance
+        xtol = self.price_tol/np.sqrt(H) if (H > 0) else 1e-8
+        sigma, result = scipy.optimize.brentq(self.direction, lo, hi, xtol=xtol,
+                                              maxiter=self.opt_iter, full_output=True, disp=False)
+        self.iterations += 1 + result.function_calls
+        self.converged = result.converged
+        if (not result.converged):
+            self.reason = result.flag
+        self.sigma = sigma
+        self.gradient(sigma) # leave Ctv, Ptv at the solution
+
+    def _european(self):
+        res = iv_chain_european(self.S, self.K, self.Cmp, self.Cmp, self.Pmp, self.Pmp, self.rate, self.time,
+                                self.amop_steps, self.premium_tol, self.price_tol, self.opt_iter, self.vol_bounds)
+        self.sigma, self.Ctv, self.Ptv = res.sigma[0], res.Ctv[0], res.Ptv[0]
+        self.iterations = res.iterations[0]
+        self.converged = bool(res.converged[0])
+        if (not self.converged):
+            self.reason = "no volatility in %s fits the quotes" % (self.vol_bounds,)
+
     def calc(self):
+        self.iterations = 0
+        self.converged = False
+        self.reason = None
+        if (self.Cmp <= 0 and self.Pmp <= 0):
+            self.reason = "no quotes"
+            return self.sigma
+        if (self.solver == 'newton'):
+            self._newton()
+            return self.sigma
+        if (self.solver == 'brent'):
+            self._brent()
+            return self.sigma
+        if (self.solver == 'european'):
+            self._european()
+            return self.sigma
         out = scipy.optimize.fmin(func=self.cost, x0=self.sigma, maxiter=self.opt_iter, disp=self.disp, full_output=self.full_output)
         self.sigma = out[0][0] if (self.full_output) else out[0]
         return out
 
+ChainIV = collections.namedtuple('ChainIV', ['sigma', 'Ctv', 'Ptv', 'iterations', 'converged'])
+
+def _seed_chain(S, K, Cmp, Pmp, rate, time):
+    """Starting volatilities from the Corrado-Miller approximation, applied to the
+    out of the money leg (as a call price through European put-call parity).
+    Where the approximation breaks down, fall back to the inflection point of the 
+    Black-Scholes price in sigma (Manaster-Koehler).
+    """
+    X = K*np.exp(-rate*time)
+    C = np.where((K > S) & (Cmp > 0) | (Pmp <= 0), Cmp, Pmp+S-X)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        c = C-0.5*(S-X)
+        root = np.sqrt(np.maximum(0.0, c*c-(S-X)**2/np.pi))
+        sigma = np.sqrt(2.0*np.pi/time)/(S+X)*(c+root)
+        fallback = np.sqrt(2.0*np.abs(np.log(S/K)+rate*time)/time)
+    return np.where(np.isfinite(sigma) & (sigma > 0.01), sigma, np.maximum(0.1, fallback))
+
+def iv_chain(S, K, Cb, Ca, Pb, Pa, rate, time, amop_steps=100, sigma0=None, price_tol=1e-4, max_iter=50,
+             vol_bounds=(1e-4, 5.0)):
+    """Implied volatilities of a whole chain, solved together.
+    Each iteration prices every unsolved contract in one vectorized lattice pass per 
+    leg (Amop chain pricers) and takes a safeguarded Gauss-Newton step on the call+put 
+    squared error of IV, bisecting when the step leaves the bracket. The vega of 
+    each leg is the secant slope of its lattice price over the last two iterates 
+    (the Black-Scholes vega on the first iteration), so no extra lattices are needed.
+    Contracts drop out as they converge (vega weighted price error below price_tol) 
+    or their bracket collapses.
+    All arguments but amop_steps, price_tol, max_iter and vol_bounds may be arrays.
+    sigma0 is the starting volatility (scalar or per contract), where it is None or 
+    NaN a Corrado-Miller estimate from the out of the money leg.
+    @return: ChainIV(sigma, Ctv, Ptv, iterations, converged) arrays
+    """
+    S, K, Cb, Ca, Pb, Pa, rate, time = np.broadcast_arrays(
+        *[np.atleast_1d(np.asarray(x, dtype=float)) for x in (S, K, Cb, Ca, Pb, Pa, rate, time)])
+    Cmp = 0.5*(Cb+Ca)
+    Pmp = 0.5*(Pb+Pa)
+    seed = _seed_chain(S, K, Cmp, Pmp, rate, time)
+    if (sigma0 is not None):
+        sigma0 = np.asarray(sigma0, dtype=float)*np.ones(len(S))
+        seed = np.where(np.isnan(sigma0), seed, sigma0)
+    sigma = seed
+    n = len(S)
+    lo = np.full(n, vol_bounds[0])
+    hi = np.full(n, vol_bounds[1])
+    sigma = np.clip(sigma, lo, hi)
+    Ctv = np.zeros(n)
+    Ptv = np.zeros(n)
+    last = (np.full(n, np.nan), Ctv.copy(), Ptv.copy()) # previous iterate, for the secant vegas
+    iterations = np.zeros(n, dtype=int)
+    converged = np.zeros(n, dtype=bool)
+    active = np.flatnonzero((Cmp > 0) | (Pmp > 0))
+
+    for i in xrange(0, max_iter):
+        if (active.size == 0):
+            break
+        a = active
+        s = sigma[a]
+        calls = a[Cmp[a] > 0]
+        puts = a[Pmp[a] > 0]
+        Ctv[calls] = Amop.option_price_call_american_binomial_chain(S[calls], K[calls], rate[calls], sigma[calls], time[calls], amop_steps, method='crr')
+        Ptv[puts] = Amop.option_price_put_american_binomial_chain(S[puts], K[puts], rate[puts], sigma[puts], time[puts], amop_steps, method='crr')
+        vega = BlackScholes.option_vega_black_scholes(S[a], K[a], rate[a], s, time[a])
+        ds = s-last[0][a]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            secant = np.abs(ds) > 1e-10
+            vc = np.where(secant, (Ctv[a]-last[1][a])/ds, vega)
+            vp = np.where(secant, (Ptv[a]-last[2][a])/ds, vega)
+        last[0][a], last[1][a], last[2][a] = s, Ctv[a], Ptv[a]
+        rc = np.where(Cmp[a] > 0, Ctv[a]-Cmp[a], 0.0)
+        rp = np.where(Pmp[a] > 0, Ptv[a]-Pmp[a], 0.0)
+        error = rc+rp
+        g = vc*rc + vp*rp
+        H = np.where(Cmp[a] > 0, vc*vc, 0.0) + np.where(Pmp[a] > 0, vp*vp, 0.0)
+        iterations[a] += 1
+        with np.errstate(divide='ignore', invalid='ignore'):
+            done = (H > 1e-12) & (np.abs(g)/np.sqrt(H) < price_tol)
+            above = np.where(H > 1e-12, g, error) > 0
+            hi[a] = np.where(above, s, hi[a])
+            lo[a] = np.where(above, lo[a], s)
+            step = s-g/H
+        inside = (step > lo[a]) & (step < hi[a])
+        sigma[a] = np.where(done, s, np.where(inside, step, 0.5*(lo[a]+hi[a])))
+        converged[a] = done
+        active = a[~done & (hi[a]-lo[a] > 1e-10)]
+    return ChainIV(sigma, Ctv, Ptv, iterations, converged)
+
+def _put_premium(S, K, rate, sigma, time):
+    """Early exercise premium estimate of a put: Barone-Adesi Whaley less Black-Scholes
+    (calls are never exercised early without dividends)"""
+    european = BlackScholes.option_price_put_black_scholes(S, K, rate, sigma, time)
+    return np.maximum(0.0, BaroneAdesiWhaley.option_price_put_american_baw(S, K, rate, sigma, time)-european)
+
+def iv_chain_european(S, K, Cb, Ca, Pb, Pa, rate, time, amop_steps=100, premium_tol=0.01, price_tol=1e-4,
+                      max_iter=50, vol_bounds=(1e-4, 5.0)):
+    """Fast implied volatilities of a chain from the analytic European inversion.
+    The mid of each leg is inverted with Black-Scholes, and the vol is corrected for 
+    the early exercise premium (Barone-Adesi Whaley estimate) to first order, 
+    sigma - premium/vega. The legs are combined weighted by vega squared, the 
+    linearized least squares fit of IV. Contracts with a premium above premium_tol, 
+    or without a European vol (quoted at or outside the European bounds), are solved 
+    with the tree (iv_chain), starting from the fast vol where there is one.
+    Arguments are as for iv_chain.
+    @param premium_tol: largest early exercise premium trusted to the estimate
+    @return: ChainIV(sigma, Ctv, Ptv, iterations, converged) arrays, iterations counts 
+             the tree iterations (0 on the fast path)
+    """
+    S, K, Cb, Ca, Pb, Pa, rate, time = np.broadcast_arrays(
+        *[np.atleast_1d(np.asarray(x, dtype=float)) for x in (S, K, Cb, Ca, Pb, Pa, rate, time)])
+    n = len(S)
+    # both legs in one pass, calls first
+    mid = np.concatenate((0.5*(Cb+Ca), 0.5*(Pb+Pa)))
+    call = np.arange(2*n) < n
+    S2, K2, rate2, time2 = [np.tile(x, 2) for x in (S, K, rate, time)]
+    quoted = mid > 0
+    european = BlackScholes.option_implied_volatility_black_scholes(np.where(quoted, mid, np.nan), S2, K2, rate2, time2, call)
+    premium = np.zeros(2*n)
+    puts = np.flatnonzero(~call & np.isfinite(european))
+    premium[puts] = _put_premium(S2[puts], K2[puts], rate2[puts], european[puts], time2[puts])
+    vega = BlackScholes.option_vega_black_scholes(S2, K2, rate2, european, time2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        leg = european-premium/vega
+        weight = np.where(quoted, vega*vega, 0.0)
+        sigma = np.where(quoted, weight*leg, 0.0).reshape(2, n).sum(axis=0)/weight.reshape(2, n).sum(axis=0)
+        bad = (quoted & (~np.isfinite(leg) | (premium > premium_tol))).reshape(2, n).any(axis=0)
+        fast = ~bad & (sigma >= vol_bounds[0]) & (sigma <= vol_bounds[1])
+    Cq, Pq = quoted.reshape(2, n)
+    Ctv = np.zeros(n)
+    Ptv = np.zeros(n)
+    f = np.flatnonzero(fast)
+    Ctv[f] = np.where(Cq[f], BlackScholes.option_price_call_black_scholes(S[f], K[f], rate[f], sigma[f], time[f]), 0.0)
+    Ptv[f] = np.where(Pq[f], BlackScholes.option_price_put_black_scholes(S[f], K[f], rate[f], sigma[f], time[f])
+                      + premium[n:][f], 0.0)
+    sigma = np.where(fast, sigma, 0.0)
+    iterations = np.zeros(n, dtype=int)
+    converged = fast.copy()
+    slow = np.flatnonzero(~fast & (Cq | Pq))
+    if (slow.size > 0):
+        seed = np.where(np.isfinite(leg[:n]), leg[:n], leg[n:])[slow] # the tree starts from a leg's fast vol
+        res = iv_chain(S[slow], K[slow], Cb[slow], Ca[slow], Pb[slow], Pa[slow], rate[slow], time[slow],
+                       amop_steps, seed, price_tol, max_iter, vol_bounds)
+        sigma[slow], Ctv[slow], Ptv[slow] = res.sigma, res.Ctv, res.Ptv
+        iterations[slow], converged[slow] = res.iterations, res.converged
+    return ChainIV(sigma, Ctv, Ptv, iterations, converged)
+
+def iv_option_chain(chain, rate, amop_steps=100, price_tol=1e-4, max_iter=50, vol_bounds=(1e-4, 5.0)):
+    """iv_chain of the call/put pairs of an OptionChain.OptionChain
+    @return: (OptionChain.Pairs, ChainIV), one element per call
+    """
+    pairs = chain.pair()
+    res = iv_chain(pairs.underlying, pairs.strike, pairs.Cb, pairs.Ca, pairs.Pb, pairs.Pa, rate,
+                   OptionChain.tau(pairs), amop_steps, None, price_tol, max_iter, vol_bounds)
+    return pairs, res
+
+class WarmIV:
+    """Implied volatilities of a chain kept up to date across snapshots.
+    Each update re-solves (with iv_chain) only the contracts whose quotes, 
+    underlying, rate or time changed since they were last solved, starting from 
+    their previous volatility. New contracts start from the volatilities of their 
+    adjacent strikes, so the recompute cost follows how much the market moved 
+    rather than the size of the chain.
+    Contracts are identified by hashable keys; tuple keys ending with the strike, 
+    e.g. (root, expiry, strike), make the strikes sharing key[:-1] neighbours.
+    spot_tol and time_tol let the underlying (relative move) and the time to 
+    expiry drift that far from the last solve before a contract whose quotes are 
+    unchanged is solved again.
+    """
+
+    def __init__(self, amop_steps=100, price_tol=1e-4, max_iter=50, vol_bounds=(1e-4, 5.0),
+                 spot_tol=0.0, time_tol=0.0):
+        self.amop_steps = amop_steps
+        self.price_tol = price_tol
+        self.max_iter = max_iter
+        self.vol_bounds = vol_bounds
+        self.spot_tol = spot_tol
+        self.time_tol = time_tol
+        self.state = {} # key -> (quote tuple, sigma, Ctv, Ptv, converged)
+        self.solved = 0 # contracts solved by the last update
+        self.skipped = 0 # contracts carried over unchanged by the last update
+        self.changed = np.zeros(0, dtype=bool) # rows solved by the last update
+
+    def _group(self, key):
+        return key[:-1] if isinstance(key, tuple) else None
+
+    def seeds(self, keys, K):
+        """Starting volatilities: the last solve of each contract, or else the vol 
+        interpolated between the adjacent solved strikes of its group (the nearest 
+        one past the ends), NaN where nothing is known.
+        """
+        K = np.asarray(K, dtype=float)*np.ones(len(keys))
+        sigma0 = np.full(len(keys), np.nan)
+        strikes = {}
+        for key, (quote, sigma, Ctv, Ptv, converged) in self.state.iteritems():
+            if converged:
+                strikes.setdefault(self._group(key), []).append((quote[1], sigma))
+        for group in strikes:
+            strikes[group] = np.array(sorted(strikes[group])).T
+        for i, key in enumerate(keys):
+            if (key in self.state):
+                sigma0[i] = self.state[key][1]
+            elif (self._group(key) in strikes):
+                known_K, known_sigma = strikes[self._group(key)]
+                sigma0[i] = np.interp(K[i], known_K, known_sigma)
+        return sigma0
+
+    def update(self, keys, S, K, Cb, Ca, Pb, Pa, rate, time):
+        """Bring the vols of the given contracts up to date with a new snapshot.
+        @param keys: sequence of contract keys, one per row
+        All other arguments are as for iv_chain, scalars or one value per key.
+        @return: ChainIV of the given rows; iterations is 0 for the rows skipped
+        """
+        S, K, Cb, Ca, Pb, Pa, rate, time = np.broadcast_arrays(
+            *[np.asarray(x, dtype=float)*np.ones(len(keys)) for x in (S, K, Cb, Ca, Pb, Pa, rate, time)])
+        quotes = zip(S, K, Cb, Ca, Pb, Pa, rate, time)
+        changed = np.array([self._changed(key, quote) for (key, quote) in zip(keys, quotes)], dtype=bool)
+        n = len(keys)
+        sigma = np.array([self.state[key][1] if not c else np.nan for (key, c) in zip(keys, changed)])
+        Ctv = np.array([self.state[key][2] if not c else 0.0 for (key, c) in zip(keys, changed)])
+        Ptv = np.array([self.state[key][3] if not c else 0.0 for (key, c) in zip(keys, changed)])
+        converged = np.array([self.state[key][4] if not c else False for (key, c) in zip(keys, changed)], dtype=bool)
+        iterations = np.zeros(n, dtype=int)
+        idx = np.flatnonzero(changed)
+        if (idx.size > 0):
+            sub = [keys[i] for i in idx]
+            res = iv_chain(S[idx], K[idx], Cb[idx], Ca[idx], Pb[idx], Pa[idx], rate[idx], time[idx],
+                           self.amop_steps, self.seeds(sub, K[idx]), self.price_tol, self.max_iter, self.vol_bounds)
+            sigma[idx], Ctv[idx], Ptv[idx] = res.sigma, res.Ctv, res.Ptv
+            iterations[idx], converged[idx] = res.iterations, res.converged
+            for j, i in enumerate(idx):
+                self.state[sub[j]] = (quotes[i], res.sigma[j], res.Ctv[j], res.Ptv[j], bool(res.converged[j]))
+        self.solved = idx.size
+        self.skipped = n-idx.size
+        self.changed = changed
+        return ChainIV(sigma, Ctv, Ptv, iterations, converged)
+
+    def _changed(self, key, quote):
+        if (key not in self.state):
+            return True
+        last = self.state[key][0]
+        if (quote[1:7] != last[1:7]): # K, quotes, rate
+            return True
+        return abs(quote[0]-last[0]) > self.spot_tol*last[0] or abs(quote[7]-last[7]) > self.time_tol
+
+    def forget(self, keys):
+        """Drop contracts, e.g. expired ones"""
+        for key in keys:
+            self.state.pop(key, None)
+
 
 if __name__ == '__main__':
 
@@ -59,3 +434,18 @@ if __name__ == '__main__':
     iv.calc()
 
     print "Vol:", iv.sigma, "TV:", iv.Ctv, "(C)", iv.Ptv, "(P)"
+
+    for solver in ('newton', 'brent', 'european'):
+        iv = IV(S, K, Cb, Ca, Pb, Pa, rate, time, amop_steps=100, solver=solver)
+        iv.calc()
+        print solver, "Vol:", iv.sigma, "TV:", iv.Ctv, "(C)", iv.Ptv, "(P)", "iterations:", iv.iterations, iv.reason or ""
+
+    strikes = np.array([95.0, 100.0, 105.0])
+    chain = iv_chain(S, strikes, [5.9, Cb, 1.6], [6.1, Ca, 1.7], [1.8, Pb, 7.4], [1.9, Pa, 7.6], rate, time)
+    print "chain Vol:", chain.sigma, "iterations:", chain.iterations
+
+    warm = WarmIV()
+    keys = [('AAPL', '2014-11-22', k) for k in strikes]
+    warm.update(keys, S, strikes, [5.9, Cb, 1.6], [6.1, Ca, 1.7], [1.8, Pb, 7.4], [1.9, Pa, 7.6], rate, time)
+    chain = warm.update(keys, S, strikes, [5.9, Cb, 1.65], [6.1, Ca, 1.75], [1.8, Pb, 7.4], [1.9, Pa, 7.6], rate, time)
+    print "warm Vol:", chain.sigma, "solved:", warm.solved, "skipped:", warm.skipped, "iterations:", chain.iterations
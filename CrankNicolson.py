@@ -0,0 +1,148 @@
+#!/usr/bin/python
+
+# American options by Crank-Nicolson finite differences on a spot grid.
+# A single solve values the option at every grid spot, so re-pricing after a
+# spot move (or a whole scenario sweep) is an interpolation on the curve, and
+# as the value is homogeneous in spot and strike the same curve prices every
+# strike of a chain.
+
+import numpy as np
+
+def _brennan_schwartz(lower, diag, upper, rhs, payoff, call):
+    """Solve the tridiagonal system with the early exercise constraint
+    (Brennan-Schwartz). The elimination runs towards the exercise region and
+    the projection max(value, payoff) is applied during back substitution,
+    which starts inside the exercise region (low spots for a put, high spots
+    for a call).
+    """
+    n = len(diag)
+    if call: # exercise region at the top, eliminate upwards
+        lower, diag, upper = upper[::-1], diag[::-1], lower[::-1]
+        rhs, payoff = rhs[::-1], payoff[::-1]
+    d = diag.copy()
+    b = rhs.copy()
+    for j in xrange(n-2, -1, -1): # eliminate the super diagonal, from the far end
+        m = upper[j]/d[j+1]
+        d[j] -= m*lower[j+1]
+        b[j] -= m*b[j+1]
+    x = np.empty(n)
+    x[0] = max(b[0]/d[0], payoff[0])
+    for j in xrange(1, n):
+        x[j] = max((b[j]-lower[j]*x[j-1])/d[j], payoff[j])
+    return x[::-1] if call else x
+
+def option_values_american_crank_nicolson(K, r, sigma, time, call, no_S_steps=200, no_t_steps=200,
+                                          S_max=None, dividend_times=(), dividend_yields=()):
+    """American Option values on a grid of spot prices using Crank-Nicolson finite
+    differences, with the early exercise handled by Brennan-Schwartz projection.
+    The first two time steps are fully implicit to damp the payoff kink.
+    @param K: strike (exercise) price,
+    @param r: interest rate
+    @param sigma: volatility
+    @param time: time to maturity
+    @param call: True for a call, False for a put
+    @param no_S_steps: Number of spot steps in the grid
+    @param no_t_steps: Number of time steps
+    @param S_max: top of the spot grid, by default well out of the money for the maturity
+    @param dividend_times: Array of dividend times. (Ex: [0.25, 0.75] for 1/4 and 3/4 of a year)
+    @param dividend_yields: Array of dividend yields for the 'dividend_times'
+    @return: (spots, values) arrays of the grid spots and the option values today
+    """
+    if (S_max is None):
+        S_max = K*max(2.0, np.exp(5.0*sigma*np.sqrt(time)))
+    spots = np.linspace(0.0, S_max, no_S_steps+1)
+    sign = 1.0 if call else -1.0
+    payoff = np.maximum(0.0, sign*(spots-K))
+    j = np.arange(1, no_S_steps, dtype=float) # interior nodes
+    alpha = 0.5*sigma*sigma*j*j - 0.5*r*j # coefficients of the spatial operator
+    beta = -(sigma*sigma*j*j + r)
+    gamma = 0.5*sigma*sigma*j*j + 0.5*r*j
+
+    # step back through the periods between dividends, in time to maturity
+    dividends = [(time-dt, y) for (dt, y) in sorted(zip(dividend_times, dividend_yields), reverse=True)
+                 if 0.0 < dt < time]
+    values = payoff.copy()
+    tau = 0.0
+    implicit_steps = 2
+    for (stop, y) in dividends + [(time, None)]:
+        steps = max(1, int(round(no_t_steps*(stop-tau)/time)))
+        dt = (stop-tau)/steps
+        for n in xrange(0, steps):
+            theta = 1.0 if implicit_steps > 0 else 0.5
+            implicit_steps -= 1
+            tau += dt
+            if call:
+                low, high = 0.0, S_max-K*np.exp(-r*tau)
+            else:
+                low, high = K, 0.0
+            rhs = values[1:-1] + (1.0-theta)*dt*(alpha*values[:-2] + beta*values[1:-1] + gamma*values[2:])
+            lower = -theta*dt*alpha
+            diag = 1.0-theta*dt*beta
+            upper = -theta*dt*gamma
+            rhs[0] -= lower[0]*low
+            rhs[-1] -= upper[-1]*high
+            values[1:-1] = _brennan_schwartz(lower, diag, upper, rhs, payoff[1:-1], call)
+            values[0], values[-1] = low, high
+        if (y is not None): # spot drops by the dividend yield
+            values = np.maximum(np.interp(spots*(1.0-y), spots, values), payoff)
+    return spots, values
+
+def _american_crank_nicolson(S, K, r, sigma, time, call, no_S_steps, no_t_steps, dividend_times, dividend_yields):
+    """Prices for any spots and strikes from one grid solve with a unit strike, 
+    using that the value is homogeneous in (S, K): V(S, K) = K V(S/K, 1)
+    """
+    S = np.asarray(S, dtype=float)
+    K = np.asarray(K, dtype=float)
+    moneyness = S/K
+    S_max = max(2.0, np.exp(5.0*sigma*np.sqrt(time)), 2.0*np.max(moneyness))
+    spots, values = option_values_american_crank_nicolson(1.0, r, sigma, time, call, no_S_steps, no_t_steps,
+                                                          S_max, dividend_times, dividend_yields)
+    return (K*np.interp(moneyness, spots, values))[()]
+
+def option_price_call_american_crank_nicolson(S, K, r, sigma, time, no_S_steps=200, no_t_steps=200,
+                                              dividend_times=(), dividend_yields=()):
+    """American Option (Call) using Crank-Nicolson finite differences.
+    All spots and strikes are valued off a single grid solve.
+    @param S: spot (underlying) price, scalar or array
+    @param K: strike (exercise) price, scalar or array
+    @param r: interest rate
+    @param sigma: volatility
+    @param time: time to maturity
+    @param no_S_steps: Number of spot steps in the grid
+    @param no_t_steps: Number of time steps
+    @param dividend_times: Array of dividend times. (Ex: [0.25, 0.75] for 1/4 and 3/4 of a year)
+    @param dividend_yields: Array of dividend yields for the 'dividend_times'
+    @return: Option price (array if S or K is an array)
+    """
+    return _american_crank_nicolson(S, K, r, sigma, time, True, no_S_steps, no_t_steps,
+                                    dividend_times, dividend_yields)
+
+def option_price_put_american_crank_nicolson(S, K, r, sigma, time, no_S_steps=200, no_t_steps=200,
+                                             dividend_times=(), dividend_yields=()):
+    """American Option (Put) using Crank-Nicolson finite differences.
+    All spots and strikes are valued off a single grid solve.
+    @param S: spot (underlying) price, scalar or array
+    @param K: strike (exercise) price, scalar or array
+    @param r: interest rate
+    @param sigma: volatility
+    @param time: time to maturity
+    @param no_S_steps: Number of spot steps in the grid
+    @param no_t_steps: Number of time steps
+    @param dividend_times: Array of dividend times. (Ex: [0.25, 0.75] for 1/4 and 3/4 of a year)
+    @param dividend_yields: Array of dividend yields for the 'dividend_times'
+    @return: Option price (array if S or K is an array)
+    """
+    return _american_crank_nicolson(S, K, r, sigma, time, False, no_S_steps, no_t_steps,
+                                    dividend_times, dividend_yields)
+
+
+if __name__ == '__main__':
+    S = 100.0
+    K = 100.0
+    r = 0.10
+    sigma = 0.25
+    time = 1.0
+    print "Crank-Nicolson American call price =", option_price_call_american_crank_nicolson(S, K, r, sigma, time)
+    print "Crank-Nicolson American put price =", option_price_put_american_crank_nicolson(S, K, r, sigma, time)
+    print "with proportional dividends:",
+    print option_price_put_american_crank_nicolson(S, K, r, sigma, time, 200, 200, [0.25, 0.75], [0.025, 0.025])
@@ -0,0 +1,188 @@
+#!/usr/bin/python
+
+# Implied volatility by table lookup.
+# American prices per unit strike are precomputed with the Amop lattice on a
+# grid of log moneyness ln(S/K), time to maturity and volatility, for one
+# interest rate, and saved as .npy files which are memory-mapped on load.
+# Quotes are inverted by interpolating the price-vs-vol curve at (moneyness,
+# time) and inverting it along the (monotone) vol axis. The interpolation
+# error measured against the lattice at build time bounds the vol error;
+# quotes outside the grid, or whose bound is too loose, get a real solve
+# (CalcIV.iv_chain).
+
+import os
+
+import numpy as np
+import scipy.ndimage
+
+import Amop
+import CalcIV
+
+DEFAULT_MONEYNESS = np.linspace(-0.5, 0.5, 51)
+DEFAULT_TIMES = np.linspace(np.sqrt(1.0/365.0), np.sqrt(2.0), 40)**2 # denser at short maturities
+DEFAULT_VOLS = np.concatenate((np.linspace(0.02, 0.6, 59), np.linspace(0.62, 2.0, 70)))
+
+def _lattice(moneyness, times, vols, rate, steps):
+    """Call and put prices per unit strike, shape (2, moneyness, times, vols)"""
+    S = np.exp(moneyness)[:, np.newaxis, np.newaxis]
+    t = times[np.newaxis, :, np.newaxis]
+    sigma = vols[np.newaxis, np.newaxis, :]
+    prices = np.empty((2, len(moneyness), len(times), len(vols)))
+    for i in xrange(0, len(moneyness)): # one moneyness at a time keeps the lattice small
+        prices[0, i] = Amop.option_price_call_american_binomial_chain(S[i], 1.0, rate, sigma[0], t[0], steps, method='crr')
+        prices[1, i] = Amop.option_price_put_american_binomial_chain(S[i], 1.0, rate, sigma[0], t[0], steps, method='crr')
+    return prices
+
+def build_table(path, rate, moneyness=DEFAULT_MONEYNESS, times=DEFAULT_TIMES, vols=DEFAULT_VOLS, amop_steps=100):
+    """Price the grid with the lattice and save it under the directory path.
+    The lattice is also run at the centre of every grid cell. The largest difference
+    to the interpolated price at the centres of a cell and its neighbours is saved 
+    as the error bound of the cell, the neighbours covering the lattice noise 
+    which the centre alone misses.
+    @param path: directory to write, created if needed
+    @param rate: interest rate of the table
+    @param moneyness: increasing grid of ln(S/K)
+    @param times: increasing grid of times to maturity
+    @param vols: increasing grid of volatilities
+    @param amop_steps: lattice steps, as for CalcIV.IV
+    @return: the IVTable
+    """
+    moneyness, times, vols = [np.asarray(x, dtype=float) for x in (moneyness, times, vols)]
+    prices = _lattice(moneyness, times, vols, rate, amop_steps)
+    mid = lambda x: 0.5*(x[1:]+x[:-1])
+    centres = _lattice(mid(moneyness), mid(np.sqrt(times))**2, mid(vols), rate, amop_steps)
+    # value interpolated at the cell centres (times are interpolated in sqrt(t))
+    interpolated = sum(prices[:, a:a+prices.shape[1]-1, b:b+prices.shape[2]-1, c:c+prices.shape[3]-1]
+                       for a in (0, 1) for b in (0, 1) for c in (0, 1))/8.0
+    error = scipy.ndimage.maximum_filter(np.abs(interpolated-centres), size=(1, 3, 3, 3))
+    if (not os.path.isdir(path)):
+        os.makedirs(path)
+    np.save(os.path.join(path, 'prices.npy'), prices)
+    np.save(os.path.join(path, 'error.npy'), error)
+    np.savez(os.path.join(path, 'axes.npz'), moneyness=moneyness, times=times, vols=vols,
+             rate=rate, amop_steps=amop_steps)
+    return IVTable(path)
+
+def _locate(grid, x):
+    """Cell index and weight of x in an increasing grid, and whether x is inside it"""
+    i = np.clip(np.searchsorted(grid, x)-1, 0, len(grid)-2)
+    w = (x-grid[i])/(grid[i+1]-grid[i])
+    return i, w, (x >= grid[0]) & (x <= grid[-1])
+
+class IVTable:
+
+    def __init__(self, path):
+        """Load a table written by build_table, the prices are memory-mapped
+        @param path: directory of the table
+        """
+        self.path = path
+        axes = np.load(os.path.join(path, 'axes.npz'))
+        self.moneyness = axes['moneyness']
+        self.times = axes['times']
+        self.vols = axes['vols']
+        self.rate = float(axes['rate'])
+        self.amop_steps = int(axes['amop_steps'])
+        self.prices = np.load(os.path.join(path, 'prices.npy'), mmap_mode='r')
+        self.error = np.load(os.path.join(path, 'error.npy'), mmap_mode='r')
+
+    def _curves(self, leg, x, t):
+        """Interpolated price-vs-vol curves (per unit strike) and the error bounds of 
+        their cells at log moneyness x and times t, with whether each point is 
+        inside the grid"""
+        i, wi, inside_x = _locate(self.moneyness, x)
+        j, wj, inside_t = _locate(np.sqrt(self.times), np.sqrt(t))
+        wi, wj = wi[:, np.newaxis], wj[:, np.newaxis]
+        table = self.prices[leg]
+        curves = ((1.0-wi)*((1.0-wj)*table[i, j] + wj*table[i, j+1])
+                  + wi*((1.0-wj)*table[i+1, j] + wj*table[i+1, j+1]))
+        return np.maximum.accumulate(curves, axis=1), self.error[leg][i, j], inside_x & inside_t
+
+    def _invert(self, curves, target):
+        """Vol where each curve crosses its target, the slope of the curve there and
+        the index of the vol cell"""
+        n, m = curves.shape
+        rows = np.arange(n)
+        k = np.clip((curves < target[:, np.newaxis]).sum(axis=1), 1, m-1)
+        lo, hi = curves[rows, k-1], curves[rows, k]
+        dv = self.vols[k]-self.vols[k-1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = (hi-lo)/dv
+            sigma = self.vols[k-1]+(target-lo)/slope
+        found = (target > curves[:, 0]) & (target <= curves[:, -1]) & (slope > 0)
+        return sigma, slope, found, k-1
+
+    def _value(self, curves, sigma):
+        k = np.clip(np.searchsorted(self.vols, sigma), 1, len(self.vols)-1)
+        rows = np.arange(len(sigma))
+        w = (sigma-self.vols[k-1])/(self.vols[k]-self.vols[k-1])
+        return (1.0-w)*curves[rows, k-1] + w*curves[rows, k]
+
+    def iv(self, S, K, Cb, Ca, Pb, Pa, time, vol_tol=5e-3, price_tol=1e-4, max_iter=50, vol_bounds=(1e-4, 5.0)):
+        """Implied volatilities of a chain (the call+put fit of CalcIV.IV) from the table.
+        The legs are combined weighted by vega squared. Contracts outside the grid, 
+        or whose vol error bound (cell price error over vega) is above vol_tol, are 
+        solved with CalcIV.iv_chain at the table rate, starting from the table vol.
+        All arguments but vol_tol, price_tol, max_iter and vol_bounds may be arrays.
+        @return: CalcIV.ChainIV(sigma, Ctv, Ptv, iterations, converged) arrays, 
+                 iterations is 0 for the contracts inverted from the table
+        """
+        S, K, Cb, Ca, Pb, Pa, time = np.broadcast_arrays(
+            *[np.atleast_1d(np.asarray(x, dtype=float)) for x in (S, K, Cb, Ca, Pb, Pa, time)])
+        n = len(S)
+        x = np.log(S/K)
+        num = np.zeros(n)
+        den = np.zeros(n)
+        ok = np.ones(n, dtype=bool)
+        legs = []
+        for leg, mid in ((0, 0.5*(Cb+Ca)), (1, 0.5*(Pb+Pa))):
+            quoted = mid > 0
+            curves, error, inside = self._curves(leg, x, time)
+            sigma, slope, found, cell = self._invert(curves, mid/K)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                good = inside & found & (error[np.arange(n), cell]/slope <= vol_tol)
+            ok &= ~quoted | good
+            weight = np.where(quoted & good, slope*slope, 0.0)
+            num += np.where(quoted & good, weight*np.where(good, sigma, 0.0), 0.0)
+            den += weight
+            legs.append((quoted, curves, np.where(quoted & good, sigma, np.nan)))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sigma = num/den
+        ok &= (den > 0)
+        Ctv = np.zeros(n)
+        Ptv = np.zeros(n)
+        f = np.flatnonzero(ok)
+        (c_quoted, c_curves, c_sigma), (p_quoted, p_curves, p_sigma) = legs
+        Ctv[f] = np.where(c_quoted[f], K[f]*self._value(c_curves[f], sigma[f]), 0.0)
+        Ptv[f] = np.where(p_quoted[f], K[f]*self._value(p_curves[f], sigma[f]), 0.0)
+        sigma = np.where(ok, sigma, 0.0)
+        iterations = np.zeros(n, dtype=int)
+        converged = ok.copy()
+        slow = np.flatnonzero(~ok & (c_quoted | p_quoted))
+        if (slow.size > 0):
+            seed = np.where(np.isfinite(c_sigma), c_sigma, p_sigma)[slow] # NaN -> default seed
+            res = CalcIV.iv_chain(S[slow], K[slow], Cb[slow], Ca[slow], Pb[slow], Pa[slow], self.rate, time[slow],
+                                  self.amop_steps, seed, price_tol, max_iter, vol_bounds)
+            sigma[slow], Ctv[slow], Ptv[slow] = res.sigma, res.Ctv, res.Ptv
+            iterations[slow], converged[slow] = res.iterations, res.converged
+        return CalcIV.ChainIV(sigma, Ctv, Ptv, iterations, converged)
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+
+    path = sys.argv[1] if (len(sys.argv) > 1) else 'ivtable'
+    if (os.path.exists(os.path.join(path, 'prices.npy'))):
+        table = IVTable(path)
+    else:
+        start = time.time()
+        table = build_table(path, 0.01)
+        print "built", path, "in", time.time()-start, "s"
+    K = np.linspace(80.0, 120.0, 2000)
+    sigma = 0.2+0.1*((K-100.0)/20.0)**2
+    C = Amop.option_price_call_american_binomial_chain(100.0, K, table.rate, sigma, 0.25, table.amop_steps)
+    P = Amop.option_price_put_american_binomial_chain(100.0, K, table.rate, sigma, 0.25, table.amop_steps)
+    start = time.time()
+    res = table.iv(100.0, K, C, C, P, P, 0.25)
+    print len(K), "IVs in", time.time()-start, "s,", (res.iterations == 0).sum(), "from the table,",
+    print "largest vol error", np.abs(res.sigma-sigma).max()
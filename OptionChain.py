@@ -0,0 +1,131 @@
+#!/usr/bin/python
+
+# Option chains as struct-of-arrays.
+# OCC symbols (root, YYMMDD expiry, C/P, strike x 1000 in 8 digits) are parsed
+# for all rows at once on the raw bytes. Roots are kept as categories (codes
+# into a table of names), expiries as int32 days since 1970-01-01 and strikes
+# as floats. Rows are sorted by (root, expiry, quote time, strike, call before
+# put) so every (root, expiry) is a contiguous range of strikes, and calls
+# pair with their puts by a merge of neighbouring rows.
+
+import collections
+
+import numpy as np
+import pandas as pd
+
+EPOCH = np.datetime64('1970-01-01', 'D')
+
+Pairs = collections.namedtuple('Pairs', ['root', 'quote_time', 'underlying', 'expiry', 'strike',
+                                         'Cb', 'Ca', 'Pb', 'Pa', 'row'])
+
+def parse_occ(symbols):
+    """Split OCC option symbols, e.g. AAPL141122C00100000
+    @param symbols: sequence of symbols
+    @return: (root names, root codes, expiry days since 1970-01-01, call flags, strikes)
+    """
+    sym = np.asarray(symbols, dtype='S')
+    n, width = len(sym), sym.dtype.itemsize
+    length = np.char.str_len(sym)
+    if (n > 0 and length.min() < 16):
+        raise ValueError("not an OCC symbol: '%s'" % sym[np.argmin(length)])
+    chars = sym.view(np.uint8).reshape(n, width)
+    tail = chars[np.arange(n)[:, np.newaxis], (length-15)[:, np.newaxis]+np.arange(15)]
+    digits = tail.astype(np.int64)-ord('0')
+    year = 2000+digits[:, 0]*10+digits[:, 1]
+    month = digits[:, 2]*10+digits[:, 3]
+    day = digits[:, 4]*10+digits[:, 5]
+    months = ((year-1970)*12+month-1).astype('datetime64[M]')
+    expiry = ((months.astype('datetime64[D]')-EPOCH).astype(np.int64)+day-1).astype(np.int32)
+    call = tail[:, 6] == ord('C')
+    strike = digits[:, 7:].dot(10**np.arange(7, -1, -1))/1000.0
+    root_chars = np.where(np.arange(width) < (length-15)[:, np.newaxis], chars, 0).astype(np.uint8)
+    names, codes = np.unique(root_chars.view('S%d' % width).ravel(), return_inverse=True)
+    return names, codes.astype(np.int32), expiry, call, strike
+
+class OptionChain:
+
+    def __init__(self, symbols, bid, ask, underlying, quote_time):
+        """
+        @param symbols: OCC option symbols
+        @param bid: bid prices
+        @param ask: ask prices
+        @param underlying: underlying prices
+        @param quote_time: quote times, anything numpy converts to datetime64
+        """
+        roots, root, expiry, call, strike = parse_occ(symbols)
+        bid, ask, underlying = [np.asarray(x, dtype=float)*np.ones(len(root)) for x in (bid, ask, underlying)]
+        quote_time = np.broadcast_arrays(np.asarray(quote_time, dtype='datetime64[ns]'), root)[0]
+        order = np.lexsort((~call, strike, quote_time, expiry, root))
+        self.roots = roots # root names, indexed by the codes in root
+        self.root = root[order]
+        self.expiry = expiry[order]
+        self.quote_time = quote_time[order]
+        self.strike = strike[order]
+        self.call = call[order]
+        self.bid = bid[order]
+        self.ask = ask[order]
+        self.underlying = underlying[order]
+        self.row = order # input row of each contract
+        starts = np.flatnonzero(np.r_[True, (self.root[1:] != self.root[:-1]) | (self.expiry[1:] != self.expiry[:-1])])
+        stops = np.r_[starts[1:], len(order)]
+        self.index = dict(((self.roots[self.root[a]], int(self.expiry[a])), slice(a, b))
+                          for (a, b) in zip(starts, stops))
+
+    def __len__(self):
+        return len(self.row)
+
+    def expiry_dates(self, expiry=None):
+        """@return: expiry days (all contracts by default) as datetime64[D]"""
+        return EPOCH + (self.expiry if expiry is None else expiry)
+
+    def group(self, root, expiry):
+        """Contracts of one root and expiry, sorted by quote time and strike.
+        @param root: root name
+        @param expiry: days since 1970-01-01, or a date string
+        @return: slice into the arrays of the chain
+        """
+        if (not isinstance(expiry, (int, long, np.integer))):
+            expiry = int((np.datetime64(expiry, 'D')-EPOCH).astype(np.int64))
+        return self.index[(root, expiry)]
+
+    def pair(self):
+        """Pair every call with the put of the same root, expiry, quote time,
+        underlying and strike, which is the next row when there is one. Calls
+        without a put get zero put quotes; puts without a call are dropped.
+        @return: Pairs of arrays, one element per call, in chain order; row is the
+                 input row of the call
+        """
+        same = ((self.root[1:] == self.root[:-1]) & (self.expiry[1:] == self.expiry[:-1])
+                & (self.quote_time[1:] == self.quote_time[:-1]) & (self.strike[1:] == self.strike[:-1])
+                & (self.underlying[1:] == self.underlying[:-1]))
+        has_put = np.r_[same & self.call[:-1] & ~self.call[1:], False]
+        calls = np.flatnonzero(self.call)
+        puts = np.minimum(calls+1, len(self)-1)
+        matched = has_put[calls]
+        Pb = np.where(matched, self.bid[puts], 0.0)
+        Pa = np.where(matched, self.ask[puts], 0.0)
+        return Pairs(self.root[calls], self.quote_time[calls], self.underlying[calls], self.expiry[calls],
+                     self.strike[calls], self.bid[calls], self.ask[calls], Pb, Pa, self.row[calls])
+
+def tau(pairs):
+    """Time to expiry in years of whole days, as surface.ivs counts it"""
+    expiry = (EPOCH + pairs.expiry).astype('datetime64[ns]')
+    return ((expiry - pairs.quote_time) // np.timedelta64(1, 'D')) / 365.0
+
+def from_frame(frame):
+    """OptionChain of a market data frame with Symbol, Bid, Ask, Underlying_Price
+    and Quote_Time columns (as read by surface.py). Quote times may be in any
+    format pd.to_datetime reads, e.g. 10/3/2014 15:59"""
+    return OptionChain(frame['Symbol'].values, frame['Bid'].values, frame['Ask'].values,
+                       frame['Underlying_Price'].values, pd.to_datetime(frame['Quote_Time']).values)
+
+
+if __name__ == '__main__':
+    chain = OptionChain(['AAPL141122C00100000', 'AAPL141122P00100000', 'AAPL141122C00105000',
+                         'AAPL7141122C00100000', 'AAPL141220P00100000'],
+                        [3.45, 4.15, 1.60, 3.40, 5.10], [3.55, 4.25, 1.70, 3.55, 5.30], 99.62,
+                        '2014-10-03T15:59:00')
+    print "roots:", chain.roots, "expiries:", chain.expiry_dates()
+    print "AAPL 2014-11-22:", chain.strike[chain.group('AAPL', '2014-11-22')]
+    pairs = chain.pair()
+    print "pairs:", zip(chain.roots[pairs.root], pairs.strike, pairs.Cb, pairs.Pb), "tau:", tau(pairs)
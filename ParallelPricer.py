@@ -0,0 +1,97 @@
+#!/usr/bin/python
+
+# Spread batches of Amop pricing calls or CalcIV.IV solves over a process pool.
+# Results always come back in input order; small batches run in-process where
+# the IPC would cost more than the work.
+
+import inspect
+import multiprocessing
+import time
+
+import Amop
+from CalcIV import IV
+
+def _price(job):
+    func, args, kwargs = job
+    return func(*args, **kwargs)
+
+def _solve(job):
+    iv, method = job
+    if (Amop.DEFAULT_METHOD != method): # a worker forked before set_default_method
+        Amop.set_default_method(method)
+    iv.calc()
+    return iv
+
+class PricingPool:
+
+    def __init__(self, processes=None, min_parallel=64, chunks_per_process=4):
+        """
+        @param processes: number of worker processes, all cores by default
+        @param min_parallel: batches smaller than this run in-process
+        @param chunks_per_process: jobs are sent in about this many chunks per worker
+        """
+        self.processes = processes or multiprocessing.cpu_count()
+        self.min_parallel = min_parallel
+        self.chunks_per_process = chunks_per_process
+        self.pool = None
+
+    def _map(self, func, jobs):
+        if (len(jobs) < self.min_parallel or self.processes < 2):
+            return [func(job) for job in jobs]
+        if (self.pool is None):
+            self.pool = multiprocessing.Pool(self.processes)
+        chunksize = max(1, len(jobs) // (self.processes*self.chunks_per_process))
+        return self.pool.map(func, jobs, chunksize)
+
+    def price(self, func, arg_tuples):
+        """Call func(*args) for every tuple in arg_tuples. Pricers with a method
+        argument are called with the current Amop.DEFAULT_METHOD.
+        @param func: a module level pricer, e.g. Amop.option_price_put_american_binomial
+        @param arg_tuples: list of argument tuples, e.g. (S, K, r, sigma, t, steps)
+        @return: list of results, in the order of arg_tuples
+        """
+        kwargs = {}
+        if ('method' in inspect.getargspec(func).args): # the caller's default, not the workers'
+            kwargs['method'] = Amop.DEFAULT_METHOD
+        return self._map(_price, [(func, tuple(args), kwargs) for args in arg_tuples])
+
+    def solve(self, ivs):
+        """Run calc() on every IV. The solved state (sigma, Ctv, Ptv) is copied
+        back onto the given instances, as if calc() had been called in-process.
+        The cache of an IV is not copied back, the entries the workers add stay
+        in the workers.
+        @param ivs: list of CalcIV.IV instances
+        @return: the same list
+        """
+        solved = self._map(_solve, [(iv, Amop.DEFAULT_METHOD) for iv in ivs])
+        for iv, result in zip(ivs, solved):
+            if (iv is not result):
+                state = dict(result.__dict__)
+                state.pop('cache', None) # keep the caller's cache, not the worker's copy
+                iv.__dict__.update(state)
+        return ivs
+
+    def close(self):
+        if (self.pool is not None):
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+
+if __name__ == '__main__':
+    import numpy as np
+
+    strikes = np.linspace(50.0, 150.0, 2000)
+    jobs = [(100.0, K, 0.01, 0.3, 0.5, 200) for K in strikes]
+    for processes in (1, multiprocessing.cpu_count()):
+        pool = PricingPool(processes)
+        start = time.time()
+        prices = pool.price(Amop.option_price_put_american_binomial, jobs)
+        print processes, "processes:", len(prices), "prices in", time.time() - start, "s"
+        pool.close()
+
+    ivs = [IV(99.62, K, 3.45, 3.55, 4.15, 4.25, 0.01, 0.136986301369863) for K in (95.0, 100.0, 105.0)]
+    pool = PricingPool(min_parallel=1)
+    for iv in pool.solve(ivs):
+        print "K:", iv.K, "Vol:", iv.sigma
+    pool.close()
@@ -0,0 +1,122 @@
+#!/usr/bin/python
+
+# Opt-in memoization of the Amop pricers.
+# Float inputs are snapped to a grid (the quantization) before pricing and
+# lookup, so repeated (S, K, r, sigma, t, steps) combinations cost a
+# dictionary lookup. Entries are evicted least recently used first once either
+# the entry count or the estimated memory use goes over its cap.
+
+import collections
+import inspect
+import sys
+
+import numpy as np
+
+import Amop
+
+DEFAULT_QUANTA = {'S': 1e-4, 'K': 1e-4, 'r': 1e-6, 'sigma': 1e-6, 't': 1e-6, 'time': 1e-6}
+
+class PriceCache:
+
+    def __init__(self, max_entries=100000, max_bytes=64*1024*1024, quanta=None):
+        """
+        @param max_entries: maximum number of cached prices
+        @param max_bytes: maximum estimated memory used by the cache
+        @param quanta: dict of argument name -> quantum, merged over DEFAULT_QUANTA.
+                       A quantum of 0 (or None) keys on the exact value.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.quanta = dict(DEFAULT_QUANTA)
+        self.quanta.update(quanta or {})
+        self.entries = collections.OrderedDict() # key -> (value, size), oldest first
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.wrapped = {}
+
+    def __getstate__(self):
+        # the wrapped pricers are closures, which do not pickle; wrap() makes them again
+        state = dict(self.__dict__)
+        state['wrapped'] = {}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    def _snap(self, name, value):
+        q = self.quanta.get(name)
+        if (isinstance(value, (int, long, float)) and q):
+            steps = int(round(value/q))
+            return steps, steps*q
+        if (isinstance(value, (list, tuple))):
+            return tuple(value), value
+        return value, value
+
+    def _insert(self, key, value):
+        size = sys.getsizeof(key) + sum(sys.getsizeof(k) for k in key) + sys.getsizeof(value)
+        self.entries[key] = (value, size)
+        self.nbytes += size
+        while (len(self.entries) > self.max_entries or self.nbytes > self.max_bytes):
+            old_key, (old_value, old_size) = self.entries.popitem(last=False)
+            self.nbytes -= old_size
+            self.evictions += 1
+
+    def wrap(self, func):
+        """Cached version of a pricer, with the same signature.
+        Calls with array arguments are passed straight through.
+        @param func: e.g. Amop.option_price_call_american_binomial
+        @return: the cached function
+        """
+        if (func in self.wrapped):
+            return self.wrapped[func]
+        names = inspect.getargspec(func).args
+        ident = (func.__module__, func.__name__)
+        method = names.index('method') if 'method' in names else None
+
+        def cached(*args, **kwargs):
+            args = list(args)
+            for name in names[len(args):]: # keyword arguments in positional order
+                if (name not in kwargs):
+                    break
+                args.append(kwargs.pop(name))
+            if (kwargs or any(isinstance(x, np.ndarray) for x in args)):
+                return func(*args, **kwargs)
+            snapped = [self._snap(name, x) for (name, x) in zip(names, args)]
+            key = ident + tuple(k for (k, x) in snapped)
+            if (method is not None and (len(args) <= method or args[method] is None)):
+                key += (Amop.DEFAULT_METHOD,) # the method the pricer will use
+            if (key in self.entries):
+                self.hits += 1
+                value, size = self.entries.pop(key)
+                self.entries[key] = (value, size) # most recently used
+                return value
+            self.misses += 1
+            value = func(*[x for (k, x) in snapped])
+            self._insert(key, value)
+            return value
+
+        cached.__name__ = func.__name__
+        cached.__doc__ = func.__doc__
+        self.wrapped[func] = cached
+        return cached
+
+    def stats(self):
+        """@return: dict of hits, misses, evictions, entries and estimated bytes"""
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'entries': len(self.entries), 'bytes': self.nbytes}
+
+    def clear(self):
+        self.entries.clear()
+        self.nbytes = 0
+
+
+if __name__ == '__main__':
+    cache = PriceCache(max_entries=1000)
+    put = cache.wrap(Amop.option_price_put_american_binomial)
+    for i in xrange(0, 3):
+        for K in (95.0, 100.0, 105.0):
+            put(100.0, K, 0.01, 0.3, 0.5, 100)
+    print put(100.0, 100.0, 0.01, 0.3, 0.5, 100), Amop.option_price_put_american_binomial(100.0, 100.0, 0.01, 0.3, 0.5, 100)
+    print cache.stats()
@@ -0,0 +1,171 @@
+#!/usr/bin/python
+
+# SVI fit of IV surfaces.
+# Each expiry is fitted with a raw SVI slice of total implied variance
+# w(k) = a + b (rho (k-m) + sqrt((k-m)^2 + s^2)) in log forward moneyness
+# k = ln(K/F), so a surface is five numbers per expiry. Between expiries the
+# total variance at a strike is interpolated linearly in tau, and beyond the
+# first and last expiries the vol of the nearest slice is kept.
+
+import sys
+
+import numpy as np
+import scipy.optimize
+
+PARAMS = ('a', 'b', 'rho', 'm', 's')
+
+def svi_total_variance(k, a, b, rho, m, s):
+    """Raw SVI total implied variance at log forward moneyness k"""
+    x = k-m
+    return a + b*(rho*x + np.sqrt(x*x + s*s))
+
+def _residuals(p, k, w, weights):
+    return weights*(svi_total_variance(k, *p)-w)
+
+def _jacobian(p, k, w, weights):
+    a, b, rho, m, s = p
+    x = k-m
+    R = np.sqrt(x*x + s*s)
+    return weights[:, np.newaxis]*np.column_stack((np.ones(len(k)), rho*x + R, b*x, -b*(rho + x/R), b*s/R))
+
+def fit_slice(k, w, weights=None):
+    """Least squares fit of a raw SVI slice.
+    @param k: log forward moneyness ln(K/F) of the points
+    @param w: total implied variance IV^2 tau of the points
+    @param weights: optional weights of the points
+    @return: array of the parameters (a, b, rho, m, s)
+    """
+    k, w = np.asarray(k, dtype=float), np.asarray(w, dtype=float)
+    weights = np.ones(len(k)) if (weights is None) else np.asarray(weights, dtype=float)
+    m0 = k[np.argmin(w)]
+    s0 = 0.1
+    b0 = max(1e-3, 0.5*(np.ptp(w)/max(np.ptp(k), 1e-6)))
+    p0 = np.array([max(w.min()-b0*s0, -w.min()), b0, 0.0, m0, s0])
+    lower = [-np.inf, 0.0, -0.999, k.min()-1.0, 1e-4]
+    upper = [np.inf, np.inf, 0.999, k.max()+1.0, 10.0]
+    p0 = np.clip(p0, lower, upper)
+    result = scipy.optimize.least_squares(_residuals, p0, jac=_jacobian, bounds=(lower, upper),
+                                          args=(k, w, weights), method='trf', x_scale='jac')
+    return result.x
+
+class SVISurface:
+
+    def __init__(self, symbol, spot, rate, taus, params):
+        """
+        @param symbol: underlying symbol
+        @param spot: underlying price the surface was fitted at
+        @param rate: interest rate (forwards are spot*exp(rate*tau))
+        @param taus: increasing times to expiry of the slices
+        @param params: (len(taus), 5) array of the slice parameters, as from fit_slice
+        """
+        self.symbol = symbol
+        self.spot = float(spot)
+        self.rate = float(rate)
+        self.taus = np.asarray(taus, dtype=float)
+        self.params = np.asarray(params, dtype=float).reshape(len(self.taus), len(PARAMS))
+
+    def _slice_variance(self, i, strike):
+        k = np.log(strike/(self.spot*np.exp(self.rate*self.taus[i])))
+        p = self.params[i]
+        return svi_total_variance(k, p[..., 0], p[..., 1], p[..., 2], p[..., 3], p[..., 4])
+
+    def total_variance(self, strike, tau):
+        """Total implied variance, vectorized over strikes and taus"""
+        strike, tau = np.broadcast_arrays(np.asarray(strike, dtype=float), np.asarray(tau, dtype=float))
+        n = len(self.taus)
+        if (n == 1):
+            return self._slice_variance(np.zeros(strike.shape, dtype=int), strike)*tau/self.taus[0]
+        i = np.clip(np.searchsorted(self.taus, tau)-1, 0, n-2)
+        t0, t1 = self.taus[i], self.taus[i+1]
+        w0 = self._slice_variance(i, strike)
+        w1 = self._slice_variance(i+1, strike)
+        inside = w0 + (tau-t0)/(t1-t0)*(w1-w0)
+        return np.where(tau < self.taus[0], w0*tau/t0, np.where(tau > self.taus[-1], w1*tau/t1, inside))
+
+    def iv(self, strike, tau):
+        """Implied volatility at any strikes and times to expiry (broadcast against each other)"""
+        tau = np.asarray(tau, dtype=float)
+        with np.errstate(invalid='ignore'):
+            return np.sqrt(np.maximum(self.total_variance(strike, tau), 0.0)/tau)[()]
+
+    def save(self, path):
+        """Write the parameters (only) to an .npz file"""
+        np.savez(path, symbol=self.symbol, spot=self.spot, rate=self.rate, taus=self.taus, params=self.params)
+
+def load_surface(path):
+    """SVISurface saved by SVISurface.save"""
+    f = np.load(path)
+    return SVISurface(str(f['symbol']), f['spot'], f['rate'], f['taus'], f['params'])
+
+def fit_surface(symbol, spot, rate, strikes, taus, ivs, weights=None, min_points=5):
+    """Fit an SVI slice to the IVs of every expiry with at least min_points quotes.
+    @param strikes, taus, ivs: arrays of the per-strike IVs, e.g. surface.py output
+    @param weights: optional weights of the points
+    @return: SVISurface
+    """
+    strikes, taus, ivs = [np.asarray(x, dtype=float) for x in (strikes, taus, ivs)]
+    weights = np.ones(len(ivs)) if (weights is None) else np.asarray(weights, dtype=float)
+    good = np.isfinite(ivs) & (ivs > 0) & (taus > 0)
+    slices = []
+    params = []
+    for tau in np.unique(taus[good]):
+        rows = good & (taus == tau)
+        if (rows.sum() < min_points):
+            continue
+        k = np.log(strikes[rows]/(spot*np.exp(rate*tau)))
+        slices.append(tau)
+        params.append(fit_slice(k, ivs[rows]**2*tau, weights[rows]))
+    if (not slices):
+        raise ValueError("no expiry of %s has %d IVs to fit" % (symbol, min_points))
+    return SVISurface(symbol, spot, rate, slices, params)
+
+def fit_surfaces(frame, rate, min_points=5):
+    """SVISurface of every symbol of surface.py output (a frame with the .ivs
+    columns, or the records of a .ivb file). Only contracts with a quoted bid
+    are fitted, at the latest underlying price of the symbol. Symbols without
+    a bid, or without min_points IVs on any expiry, are skipped.
+    @return: dict of symbol -> SVISurface
+    """
+    sym = np.asarray(frame['Sym'])
+    bid = np.asarray((frame['Bid_c'] > 0) | (frame['Bid_p'] > 0))
+    spots, strikes, taus, ivs = [np.asarray(frame[c]) for c in ('Underlying_Price', 'Strike', 'Tau', 'IV')]
+    symbols, codes = np.unique(sym, return_inverse=True)
+    order = np.argsort(codes, kind='mergesort') # rows of each symbol together, in input order
+    bounds = np.searchsorted(codes[order], np.arange(len(symbols)+1))
+    surfaces = {}
+    for j, symbol in enumerate(symbols):
+        rows = order[bounds[j]:bounds[j+1]]
+        rows = rows[bid[rows]]
+        if (not len(rows)):
+            continue
+        try:
+            surfaces[symbol] = fit_surface(symbol, spots[rows][-1], rate, strikes[rows], taus[rows], ivs[rows],
+                                           min_points=min_points)
+        except ValueError: # too few IVs to fit
+            continue
+    return surfaces
+
+
+if __name__ == '__main__':
+    if (len(sys.argv) > 1): # fit surface.py output and save the parameters
+        import pandas as pd
+        import SurfaceFile
+        if (sys.argv[1].endswith('.ivb')):
+            header, frame = SurfaceFile.read_surface(sys.argv[1])
+            rate = header['rate']
+        else:
+            frame = pd.read_csv(sys.argv[1])
+            rate = 0.01
+        for symbol, surface in fit_surfaces(frame, rate).iteritems():
+            path = '%s.%s.svi.npz' % (sys.argv[1], symbol)
+            print 'writing to - ', path, len(surface.taus), 'expiries'
+            surface.save(path)
+        sys.exit(0)
+
+    spot, rate = 100.0, 0.01
+    strikes = np.linspace(70.0, 130.0, 41)
+    truth = SVISurface('XYZ', spot, rate, [0.1, 0.5], [[0.004, 0.05, -0.4, 0.02, 0.1], [0.02, 0.1, -0.3, 0.05, 0.2]])
+    K, T = np.meshgrid(strikes, truth.taus)
+    fitted = fit_surface('XYZ', spot, rate, K.ravel(), T.ravel(), truth.iv(K.ravel(), T.ravel()))
+    print "parameters:", fitted.params
+    print "IV at K=100, tau=0.25:", fitted.iv(100.0, 0.25), truth.iv(100.0, 0.25)
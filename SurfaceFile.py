@@ -0,0 +1,151 @@
+#!/usr/bin/python
+
+# Binary IV surface files (.ivb).
+# The rows of a surface (the .ivs columns, index levels included) are stored
+# as a NumPy structured array of fixed width fields after a fixed size text
+# header. The header holds the snapshot (latest quote) time, the interest
+# rate, the row count and the record dtype, so a reader memory-maps the
+# records without parsing anything. The symbols, whose number is not bounded,
+# are a JSON list after the records; the header gives its offset and length.
+#
+# Layout: HEADER_BYTES of 'IVSURF2\n' + JSON header padded with spaces, then
+# count records of SURFACE_DTYPE, then the JSON symbol list.
+# Version 1 files ('IVSURF1\n') hold the symbols in the header and are read too.
+
+import json
+import sys
+
+import numpy as np
+import pandas as pd
+
+MAGIC = 'IVSURF2\n'
+MAGIC_V1 = 'IVSURF1\n'
+HEADER_BYTES = 4096
+
+SURFACE_DTYPE = np.dtype([('Sym', 'S8'), ('Quote_Time', 'M8[ns]'), ('Underlying_Price', 'f8'),
+                          ('Expiry', 'M8[D]'), ('Strike', 'f8'), ('Bid_c', 'f8'), ('TV_c', 'f8'),
+                          ('Ask_c', 'f8'), ('IV', 'f8'), ('Tau', 'f8'), ('Bid_p', 'f8'), ('TV_p', 'f8'),
+                          ('Ask_p', 'f8')])
+
+INDEX = ['Sym', 'Quote_Time', 'Underlying_Price', 'Expiry', 'Strike']
+COLUMNS = ['Bid_c', 'TV_c', 'Ask_c', 'IV', 'Tau', 'Bid_p', 'TV_p', 'Ask_p']
+
+def _records(frame):
+    """Structured array of a surface frame, indexed as surface.ivs returns it or
+    with the index levels as columns (as read from a .ivs csv)"""
+    if (frame.index.nlevels > 1):
+        frame = frame.reset_index()
+    records = np.empty(len(frame), dtype=SURFACE_DTYPE)
+    records['Sym'] = frame['Sym'].values.astype(str)
+    records['Quote_Time'] = pd.to_datetime(frame['Quote_Time']).values
+    records['Expiry'] = pd.to_datetime(frame['Expiry']).values.astype('M8[D]')
+    for name in ['Underlying_Price', 'Strike'] + COLUMNS:
+        records[name] = frame[name].values
+    return records
+
+class SurfaceWriter:
+
+    def __init__(self, path, rate):
+        """Write a surface file block by block, e.g. from surface.stream_ivs
+        @param path: .ivb file to write
+        @param rate: interest rate of the surface
+        """
+        self.path = path
+        self.rate = rate
+        self.count = 0
+        self.symbols = set()
+        self.snapshot = None
+        self.out = open(path, 'wb')
+        self._header() # placeholder, rewritten by close()
+
+    def _header(self, symbols_bytes=0):
+        header = json.dumps({'rate': self.rate, 'count': self.count,
+                             'snapshot': None if self.snapshot is None else str(self.snapshot),
+                             'descr': SURFACE_DTYPE.descr,
+                             'symbols_offset': HEADER_BYTES + self.count*SURFACE_DTYPE.itemsize,
+                             'symbols_bytes': symbols_bytes})
+        text = MAGIC + header + '\n'
+        if (len(text) > HEADER_BYTES):
+            raise ValueError("surface header over %d bytes" % HEADER_BYTES)
+        self.out.seek(0)
+        self.out.write(text.ljust(HEADER_BYTES))
+
+    def append(self, frame):
+        """Append the rows of a surface frame (surface.ivs output)"""
+        records = _records(frame)
+        if (len(records) == 0):
+            return
+        self.out.seek(0, 2)
+        records.tofile(self.out)
+        self.count += len(records)
+        self.symbols.update(np.unique(records['Sym']))
+        latest = records['Quote_Time'].max()
+        self.snapshot = latest if (self.snapshot is None) else max(self.snapshot, latest)
+
+    def close(self):
+        try:
+            symbols = json.dumps(sorted(self.symbols))
+            self.out.seek(0, 2)
+            self.out.write(symbols)
+            self._header(len(symbols))
+        finally:
+            self.out.close()
+
+def write_surface(path, frame, rate):
+    """Write a surface frame (surface.ivs output) to a .ivb file"""
+    writer = SurfaceWriter(path, rate)
+    writer.append(frame)
+    writer.close()
+
+def read_header(path):
+    """@return: header dict of a .ivb file (symbols, snapshot, rate, count, descr)"""
+    with open(path, 'rb') as f:
+        text = f.read(HEADER_BYTES)
+        if (text.startswith(MAGIC_V1)):
+            return json.loads(text[len(MAGIC_V1):])
+        if (not text.startswith(MAGIC)):
+            if (text.startswith(MAGIC[:6])):
+                raise ValueError("%s is a surface file of an unsupported version (%s)" % (path, text[:len(MAGIC)].strip()))
+            raise ValueError("%s is not a surface file" % path)
+        header = json.loads(text[len(MAGIC):])
+        f.seek(header['symbols_offset'])
+        header['symbols'] = json.loads(f.read(header['symbols_bytes'])) if header['symbols_bytes'] else []
+    return header
+
+def read_surface(path):
+    """Memory-map a .ivb file
+    @return: (header dict, structured array of the rows)
+    """
+    header = read_header(path)
+    descr = [tuple(str(x) for x in field) for field in header['descr']]
+    if (np.dtype(descr) != SURFACE_DTYPE):
+        raise ValueError("unknown record layout in %s" % path)
+    if (header['count'] == 0):
+        return header, np.empty(0, dtype=SURFACE_DTYPE)
+    return header, np.memmap(path, dtype=SURFACE_DTYPE, mode='r', offset=HEADER_BYTES, shape=(header['count'],))
+
+def to_frame(records):
+    """Surface rows as a flat DataFrame, the columns of a .ivs csv"""
+    frame = pd.DataFrame.from_records(np.asarray(records), columns=INDEX+COLUMNS)
+    frame['Expiry'] = frame['Expiry'].values.astype('M8[ns]')
+    return frame
+
+def csv_to_surface(csv_path, path, rate):
+    """Convert a .ivs csv to a .ivb file"""
+    write_surface(path, pd.read_csv(csv_path), rate)
+
+def surface_to_csv(path, csv_path):
+    """Convert a .ivb file to a .ivs csv, formatted as surface.py writes it"""
+    header, records = read_surface(path)
+    to_frame(records).set_index(INDEX).to_csv(csv_path, float_format='%.4f')
+
+
+if __name__ == '__main__':
+    if (len(sys.argv) < 3):
+        print "usage: SurfaceFile.py <in.ivs|in.ivb> <out.ivb|out.ivs> [rate]"
+        sys.exit(1)
+    if (sys.argv[1].endswith('.ivb')):
+        surface_to_csv(sys.argv[1], sys.argv[2])
+    else:
+        csv_to_surface(sys.argv[1], sys.argv[2], float(sys.argv[3]) if (len(sys.argv) > 3) else 0.01)
+    print 'writing to - ', sys.argv[2]
@@ -0,0 +1,54 @@
+#!/usr/bin/python
+
+# Convergence benchmark of the Amop tree schemes against a fine CRR lattice.
+# usage: amop_bench.py [S K r sigma t]
+
+import sys
+import time
+
+import Amop
+
+def reference(S, K, r, sigma, t, call, steps=10000):
+    """CRR value on a fine lattice, averaged over an even and odd step count to
+    cancel the CRR oscillation"""
+    f = Amop.option_price_call_american_binomial if call else Amop.option_price_put_american_binomial
+    return 0.5 * (f(S, K, r, sigma, t, steps, method='crr') + f(S, K, r, sigma, t, steps+1, method='crr'))
+
+def convergence(S, K, r, sigma, t, call, steps=(25, 50, 100, 200, 400, 800), tolerance=0.01):
+    """Price error and timing of every tree scheme for each step count.
+    @return: (reference price, list of (method, steps, error, seconds),
+              dict of method -> fewest steps from which |error| stays < tolerance)
+    """
+    f = Amop.option_price_call_american_binomial if call else Amop.option_price_put_american_binomial
+    ref = reference(S, K, r, sigma, t, call)
+    rows = []
+    fewest = {}
+    for method in Amop.METHODS:
+        errors = []
+        for n in steps:
+            start = time.time()
+            value = f(S, K, r, sigma, t, n, method=method)
+            elapsed = time.time() - start
+            rows.append((method, n, value - ref, elapsed))
+            errors.append(abs(value - ref))
+        for n, err in reversed(zip(steps, errors)):
+            if (err >= tolerance):
+                break
+            fewest[method] = n
+    return ref, rows, fewest
+
+if __name__ == '__main__':
+    if (len(sys.argv) == 6):
+        S, K, r, sigma, t = [float(x) for x in sys.argv[1:]]
+    else:
+        S, K, r, sigma, t = 100.0, 100.0, 0.10, 0.25, 1.0
+
+    for call in (True, False):
+        ref, rows, fewest = convergence(S, K, r, sigma, t, call)
+        print "%s reference (CRR 10000/10001 steps): %.6f" % ("Call" if call else "Put", ref)
+        print "%6s %6s %12s %10s" % ("method", "steps", "error", "ms")
+        for method, n, err, elapsed in rows:
+            print "%6s %6d %12.6f %10.3f" % (method, n, err, elapsed * 1000.0)
+        for method in Amop.METHODS:
+            print "%6s: steps for 1c accuracy: %s" % (method, fewest.get(method, "> max"))
+        print
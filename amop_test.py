@@ -1,7 +1,11 @@
 #!/usr/bin/python
 
 import unittest
+import numpy as np
 import Amop
+import BaroneAdesiWhaley
+import CrankNicolson
+import binTreeCRR
 
 class AmopTest(unittest.TestCase):
 
@@ -44,6 +48,159 @@ class AmopTest(unittest.TestCase):
         test_val = Amop.option_price_put_american_binomial(S, K, r, sigma, time, steps)
         self.assertEqual(str(round(test_val, 5)), "7.29582")
 
+    def test_option_price_american_binomial_many_steps(self):
+        S = 100
+        K = 100
+        r = 0.10
+        sigma = 0.25
+        time = 1.0
+        steps = 5000
+        test_val = Amop.option_price_call_american_binomial(S, K, r, sigma, time, steps)
+        self.assertEqual(str(round(test_val, 4)), "14.9753")
+        test_val = Amop.option_price_put_american_binomial(S, K, r, sigma, time, steps)
+        self.assertEqual(str(round(test_val, 4)), "6.5564")
+
+    def test_option_price_american_binomial_chain(self):
+        S = 100
+        strikes = [80, 90, 100, 110, 120]
+        r = 0.10
+        sigma = 0.25
+        time = 1.0
+        steps = 100
+        calls = Amop.option_price_call_american_binomial_chain(S, strikes, r, sigma, time, steps)
+        puts = Amop.option_price_put_american_binomial_chain(S, strikes, r, sigma, time, steps)
+        self.assertEqual(calls.shape, (5,))
+        for i, K in enumerate(strikes):
+            self.assertAlmostEqual(calls[i], Amop.option_price_call_american_binomial(S, K, r, sigma, time, steps), 10)
+            self.assertAlmostEqual(puts[i], Amop.option_price_put_american_binomial(S, K, r, sigma, time, steps), 10)
+        self.assertEqual(str(round(calls[2], 4)), "14.9505")
+        # per-contract spots, vols and maturities
+        spots = [100, 72]
+        vols = [0.25, 0.40]
+        times = [1.0, 0.5]
+        puts = Amop.option_price_put_american_binomial_chain(spots, [100, 72], [0.10, 0.05], vols, times, 200)
+        self.assertAlmostEqual(puts[0], Amop.option_price_put_american_binomial(100, 100, 0.10, 0.25, 1.0, 200), 10)
+        self.assertEqual(str(round(puts[1], 5)), "7.29582")
+
+    def test_option_price_partials_american_binomial(self):
+        S = 100
+        K = 100
+        r = 0.10
+        sigma = 0.25
+        time = 1.0
+        steps = 100
+        greeks = Amop.option_price_partials_american_call_binomial(S, K, r, sigma, time, steps)
+        self.assertEqual(str(round(greeks.price, 4)), "14.9505")
+        self.assertEqual(str(round(greeks.delta, 6)), "0.699792")
+        self.assertEqual(str(round(greeks.gamma, 7)), "0.0140407")
+        self.assertEqual(str(round(greeks.theta, 5)), "-9.89067")
+        bumped = (Amop.option_price_call_american_binomial(S, K, r, sigma+0.01, time, steps) -
+                  Amop.option_price_call_american_binomial(S, K, r, sigma-0.01, time, steps))/0.02
+        self.assertAlmostEqual(greeks.vega, bumped, 10)
+        greeks = Amop.option_price_partials_american_put_binomial(S, [90, 100], r, sigma, time, steps)
+        self.assertEqual(str(round(greeks.price[1], 5)), "6.54691")
+        self.assertTrue(greeks.delta[0] > greeks.delta[1])
+        self.assertTrue((greeks.vega > 0).all())
+
+    def test_option_price_partials_american_binomial_integer_time(self):
+        greeks = Amop.option_price_partials_american_call_binomial(100, 100, 0.10, 0.25, 1, 100)
+        self.assertEqual(greeks, Amop.option_price_partials_american_call_binomial(100, 100, 0.10, 0.25, 1.0, 100))
+        self.assertEqual(str(round(greeks.theta, 5)), "-9.89067")
+        greeks = Amop.option_price_partials_american_put_binomial(100, 100, 0.10, 0.005, 1.0, 100)
+        self.assertTrue(np.isfinite(greeks).all())
+        self.assertRaises(ValueError, Amop.option_price_partials_american_put_binomial, 100, 100, 0.10, 0.0, 1.0, 100)
+
+    def test_option_price_american_binomial_methods(self):
+        S = 100
+        K = 100
+        r = 0.10
+        sigma = 0.25
+        time = 1.0
+        reference = 6.55654 # CRR, 10000/10001 steps average
+        for method, steps in (('lr', 801), ('bbs', 50), ('bbsr', 200)):
+            test_val = Amop.option_price_put_american_binomial(S, K, r, sigma, time, steps, method=method)
+            self.assertAlmostEqual(test_val, reference, delta=0.002)
+        test_val = Amop.option_price_call_american_binomial(S, K, r, sigma, time, 25, method='lr')
+        self.assertAlmostEqual(test_val, 14.9757, delta=0.01)
+        self.assertEqual(Amop.option_price_call_american_binomial(S, K, r, sigma, time, 100, method='crr'),
+                         Amop.option_price_call_american_binomial(S, K, r, sigma, time, 100))
+        self.assertRaises(ValueError, Amop.option_price_call_american_binomial, S, K, r, sigma, time, 100, method='xyz')
+
+    def test_option_price_american_baw(self):
+        S = [90, 100, 110]
+        K = 100
+        r = 0.08
+        sigma = 0.20
+        time = 0.25
+        test_val = Amop.option_price_put_american_binomial(S, K, r, sigma, time, 0, method='baw')
+        self.assertEqual(test_val.shape, (3,))
+        for i in xrange(0, 3):
+            self.assertAlmostEqual(test_val[i], 
+                Amop.option_price_put_american_binomial(S[i], K, r, sigma, time, 500), delta=0.03)
+        self.assertEqual(str(round(test_val[1], 4)), "3.2201")
+        Amop.set_default_method('baw')
+        try:
+            self.assertEqual(Amop.option_price_put_american_binomial(100, K, r, sigma, time, 100), test_val[1])
+            # lattice based pricers are not affected by the default
+            self.assertEqual(str(round(Amop.option_price_partials_american_call_binomial(100, 100, 0.10, 0.25, 1.0, 100).price, 4)), "14.9505")
+        finally:
+            Amop.set_default_method('crr')
+        self.assertRaises(ValueError, Amop.set_default_method, 'xyz')
+
+    def test_option_price_american_baw_zero_rate(self):
+        S = [90.0, 100.0, 110.0]
+        test_val = Amop.option_price_put_american_binomial(S, 100.0, 0.0, 0.25, 1.0, 0, method='baw')
+        for i in xrange(0, 3):
+            for method in ('crr', 'lr'):
+                self.assertAlmostEqual(test_val[i],
+                    Amop.option_price_put_american_binomial(S[i], 100.0, 0.0, 0.25, 1.0, 500, method=method), delta=0.02)
+        self.assertEqual(str(round(test_val[0], 2)), "15.27")
+
+    def test_baw_critical_price_seed(self):
+        K, r, sigma, t = np.array([100.0]), 0.10, 0.25, 1.0
+        M = 2.0*r/(sigma*sigma)
+        q1 = -0.5*((M-1.0)+np.sqrt((M-1.0)**2+4.0*M/(1.0-np.exp(-r*t))))
+        seed = BaroneAdesiWhaley._critical_price_put(K, r, sigma, t, q1, max_iter=0)
+        critical = BaroneAdesiWhaley._critical_price_put(K, r, sigma, t, q1)
+        # the seed is below the strike, close to the critical price
+        self.assertTrue(seed[0] < K[0])
+        self.assertAlmostEqual(seed[0], critical[0], delta=2.0)
+
+    def test_binomial_tree_crr_rolling(self):
+        for put_call in ("P", "C"):
+            for style in ("A", "E"):
+                full = binTreeCRR.BinomialTreeCRR(60, 95.123, 100, 0.05, 0.2575, 1.0, put_call, style)
+                rolling = binTreeCRR.BinomialTreeCRR(60, 95.123, 100, 0.05, 0.2575, 1.0, put_call, style, mode="rolling")
+                self.assertAlmostEqual(rolling, full, 10)
+        self.assertRaises(ValueError, binTreeCRR.BinomialTreeCRR, 60, 95.123, 100, 0.05, 0.2575, 1.0, "P", "A", mode="ful")
+
+    def test_binomial_tree_crr_method(self):
+        crr = binTreeCRR.BinomialTreeCRR(60, 95.123, 100, 0.05, 0.2575, 1.0, "P", "A")
+        self.assertAlmostEqual(binTreeCRR.BinomialTreeCRR(60, 95.123, 100, 0.05, 0.2575, 1.0, "P", "A", method='crr'), crr, 10)
+        for method in ('lr', 'bbsr'):
+            test_val = binTreeCRR.BinomialTreeCRR(61, 95.123, 100, 0.05, 0.2575, 1.0, "P", "A", mode="rolling", method=method)
+            self.assertEqual(test_val, Amop.option_price_put_american_binomial(95.123, 100, 0.05, 0.2575, 1.0, 61, method=method))
+            self.assertAlmostEqual(test_val, crr, delta=0.05)
+        self.assertRaises(ValueError, binTreeCRR.BinomialTreeCRR, 60, 95.123, 100, 0.05, 0.2575, 1.0, "P", "E", method='lr')
+        self.assertRaises(ValueError, binTreeCRR.BinomialTreeCRR, 60, 95.123, 100, 0.05, 0.2575, 1.0, "P", "A", mode="boundary", method='lr')
+        self.assertRaises(ValueError, binTreeCRR.BinomialTreeCRR, 60, 95.123, 100, 0.05, 0.2575, 1.0, "P", "A", method='xyz')
+
+    def test_binomial_tree_crr_boundary(self):
+        n = 200
+        price, boundary = binTreeCRR.BinomialTreeCRR(n, 100.0, 100, 0.05, 0.25, 1.0, "P", "A", mode="boundary")
+        self.assertAlmostEqual(price, binTreeCRR.BinomialTreeCRR(n, 100.0, 100, 0.05, 0.25, 1.0, "P", "A"), 10)
+        self.assertEqual(len(boundary), n+1)
+        exercised = boundary[np.isfinite(boundary)]
+        self.assertTrue((exercised < 100).all())
+        # the critical spot of the put rises towards the strike at expiry; the nodes
+        # alternate between two grids, so compare steps of the same parity
+        for start in (0, 1):
+            b = boundary[start::2]
+            b = b[np.isfinite(b)]
+            self.assertTrue((b[1:] >= b[:-1]*(1-1e-12)).all()) # equal nodes up to rounding
+        price, boundary = binTreeCRR.BinomialTreeCRR(n, 100.0, 100, 0.05, 0.25, 1.0, "P", "E", mode="boundary")
+        self.assertTrue(boundary is None)
+
     def test_option_price_call_american_discrete_dividends_binomial(self):
         S = 100
         K = 100
@@ -71,6 +228,48 @@ class AmopTest(unittest.TestCase):
                     r, sigma, time, steps, dividend_times, dividend_amounts)
         self.assertEqual(str(round(test_val, 5)), "8.11801")
 
+    def test_option_price_american_discrete_dividends_binomial_leap(self):
+        # four dividends on a two year put, the subtrees solved in blocks
+        dividend_times = [0.25, 0.75, 1.25, 1.75]
+        dividend_amounts = [0.5] * 4
+        test_val = Amop.option_price_put_american_discrete_dividends_binomial(100.0, 100.0,
+                    0.05, 0.30, 2.0, 60, dividend_times, dividend_amounts)
+        escrowed = Amop.option_price_put_american_escrowed_dividends_binomial(100.0, 100.0,
+                    0.05, 0.30, 2.0, 60, dividend_times, dividend_amounts)
+        self.assertAlmostEqual(test_val, escrowed, delta=0.1)
+        block = Amop.DIVIDEND_BLOCK
+        Amop.DIVIDEND_BLOCK = 100
+        try:
+            blocked = Amop.option_price_put_american_discrete_dividends_binomial([100.0, 90.0], 100.0,
+                        0.05, 0.30, 2.0, 60, dividend_times, dividend_amounts)
+        finally:
+            Amop.DIVIDEND_BLOCK = block
+        self.assertAlmostEqual(blocked[0], test_val, 10)
+        self.assertAlmostEqual(blocked[1], Amop.option_price_put_american_discrete_dividends_binomial(90.0, 100.0,
+                    0.05, 0.30, 2.0, 60, dividend_times, dividend_amounts), 10)
+
+    def test_option_price_american_escrowed_dividends_binomial(self):
+        S = 100
+        K = 100
+        r = 0.10
+        sigma = 0.25
+        time = 1.0
+        steps = 100
+        dividend_times = [0.25, 0.75]
+        dividend_amounts = [2.5, 2.5]
+        test_val = Amop.option_price_call_american_escrowed_dividends_binomial(S, K, 
+                    r, sigma, time, steps, dividend_times, dividend_amounts)
+        self.assertAlmostEqual(test_val, 12.0233, delta=0.05)
+        test_val = Amop.option_price_put_american_escrowed_dividends_binomial(S, K, 
+                    r, sigma, time, steps, dividend_times, dividend_amounts)
+        self.assertAlmostEqual(test_val, 8.11801, delta=0.06)
+        # quarterly dividends on a two year option, out of reach of the recursive tree
+        dividend_times = [0.25, 0.5, 0.75, 1.0, 1.25, 1.5, 1.75]
+        dividend_amounts = [0.5] * 7
+        test_val = Amop.option_price_put_american_escrowed_dividends_binomial(S, K, 
+                    0.05, 0.30, 2.0, 1000, dividend_times, dividend_amounts)
+        self.assertTrue(13.0 < test_val < 14.5)
+
     def test_option_price_call_american_proportional_dividends_binomial(self):    
         S = 100
         K = 100
@@ -97,6 +296,30 @@ class AmopTest(unittest.TestCase):
                 K, r, sigma, time, steps, dividend_times, dividend_yields)
         self.assertEqual(str(round(test_val, 5)), "7.99971")
 
+    def test_option_price_american_crank_nicolson(self):
+        S = 100
+        K = 100
+        r = 0.10
+        sigma = 0.25
+        time = 1.0
+        test_val = CrankNicolson.option_price_put_american_crank_nicolson(S, K, r, sigma, time, 400, 400)
+        self.assertAlmostEqual(test_val, 6.5565, delta=0.002)
+        test_val = CrankNicolson.option_price_call_american_crank_nicolson(S, K, r, sigma, time, 400, 400)
+        self.assertAlmostEqual(test_val, 14.9755, delta=0.002)
+        dividend_times = [0.25, 0.75]
+        dividend_yields = [0.025, 0.025]
+        test_val = CrankNicolson.option_price_put_american_crank_nicolson(S, K, r, sigma, time, 400, 400,
+                    dividend_times, dividend_yields)
+        self.assertAlmostEqual(test_val, Amop.option_price_put_american_proportional_dividends_binomial(S, 
+                K, r, sigma, time, 1000, dividend_times, dividend_yields), delta=0.005)
+        # one grid for a whole chain of spots and strikes
+        spots = [90, 100, 110]
+        strikes = [100, 100, 110]
+        test_val = CrankNicolson.option_price_put_american_crank_nicolson(spots, strikes, r, sigma, time, 400, 400)
+        ref = Amop.option_price_put_american_binomial_chain(spots, strikes, r, sigma, time, 1000)
+        for i in xrange(0, 3):
+            self.assertAlmostEqual(test_val[i], ref[i], delta=0.005)
+
 
 if __name__ == '__main__':
     unittest.main()
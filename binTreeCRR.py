@@ -6,7 +6,9 @@
 
 import numpy as np
 
-def BinomialTreeCRR(n, Spot, k, r, v, T, PutCall, OpStyle):
+import Amop
+
+def BinomialTreeCRR(n, Spot, k, r, v, T, PutCall, OpStyle, mode="full", method=None):
     """
     n: steps
     Spot: Spot price
@@ -16,7 +18,24 @@ def BinomialTreeCRR(n, Spot, k, r, v, T, PutCall, OpStyle):
     T: Maturity
     PutCall: Call or Put
     OpStyle: European or American
+    mode: "full" fills the (n+1)x(n+1) price and option lattices,
+          "rolling" keeps a single vector of option values (O(n) memory),
+          "boundary" is "rolling" but returns (price, boundary) where boundary[i]
+          is the critical spot at step i: the highest spot at which the American
+          put is exercised (lowest for the call), nan if no node is exercised
+    method: tree scheme of Amop.METHODS ('crr', 'lr', 'bbs', 'bbsr', 'baw') for the
+            American price, solved by Amop._american_binomial; None for this CRR
+            tree. Not available for European options or the "boundary" mode.
     """
+    if mode not in ("full", "rolling", "boundary"):
+        raise ValueError("unknown mode '%s', expected 'full', 'rolling' or 'boundary'" % mode)
+    if method is not None:
+        if OpStyle!="A" or mode=="boundary":
+            raise ValueError("method= prices American options, not '%s' in mode '%s'" % (OpStyle, mode))
+        return Amop._american_binomial(Spot, k, r, v, T, n, PutCall=="C", method=method)
+    if mode in ("rolling", "boundary"):
+        return BinomialTreeCRRRolling(n, Spot, k, r, v, T, PutCall, OpStyle, mode=="boundary")
+
     dt = T/n
     u = np.exp(v*np.sqrt(dt))
     d = 1./u
@@ -50,6 +69,46 @@ def BinomialTreeCRR(n, Spot, k, r, v, T, PutCall, OpStyle):
                     optval[i,j] = max(stkval[i,j]-k, np.exp(-r*dt)*(p*optval[i+1,j]+(1-p)*optval[i+1,j+1]))
     return optval[0,0]
 
+def BinomialTreeCRRRolling(n, Spot, k, r, v, T, PutCall, OpStyle, boundary=False):
+    """
+    BinomialTreeCRR with O(n) memory: a single vector of option values, each
+    step of the backward recursion is one whole-row update.
+    Arguments as BinomialTreeCRR, and
+    boundary: also return the early exercise boundary, see BinomialTreeCRR
+    """
+    dt = T/n
+    u = np.exp(v*np.sqrt(dt))
+    d = 1./u
+    p = (np.exp(r*dt)-d)/(u-d)
+    disc = np.exp(-r*dt)
+    sign = 1. if PutCall=="C" else -1.
+
+    #option value at each final node, j down moves
+    stkval = Spot*u**np.arange(n, -n-1, -2, dtype=float)
+    optval = np.maximum(0, sign*(stkval-k))
+    critical = np.empty(n+1)
+    critical[n] = _critical_spot(stkval, optval > 0, PutCall)
+
+    #backward recursion for option price
+    for i in xrange(n-1,-1,-1):
+        stkval = stkval[1:]*u
+        optval = disc*(p*optval[:-1] + (1-p)*optval[1:])
+        if OpStyle=="A":
+            exercise = sign*(stkval-k)
+            early = (exercise > 0) & (exercise >= optval)
+            optval = np.maximum(optval, exercise)
+            critical[i] = _critical_spot(stkval, early, PutCall)
+    if boundary:
+        return optval[0], (critical if OpStyle=="A" else None)
+    return optval[0]
+
+def _critical_spot(stkval, exercised, PutCall):
+    if not exercised.any():
+        return np.nan
+    if PutCall=="P":
+        return stkval[exercised].max()
+    return stkval[exercised].min()
+
 if __name__ == "__main__":
     Spot = 95.123 #100.           # Spot Price
     k = 100 #99.               # Strike Price
@@ -64,7 +123,11 @@ if __name__ == "__main__":
     print "CRR Binomial Prices:"
     print "American Put: %s" %(BinomialTreeCRR(n, Spot, k, r, v, T, PutCall="P", OpStyle="A"))
     print "American Call: %s" %(BinomialTreeCRR(n, Spot, k, r, v, T, PutCall="C", OpStyle="A"))
+    print "American Put (Leisen-Reimer): %s" %(BinomialTreeCRR(n+1, Spot, k, r, v, T, PutCall="P", OpStyle="A", method="lr"))
     print "European Put: %s" %(BinomialTreeCRR(n, Spot, k, r, v, T, PutCall="P", OpStyle="E"))
     print "European Call: %s"%(BinomialTreeCRR(n, Spot, k, r, v, T, PutCall="C", OpStyle="A"))
+    price, boundary = BinomialTreeCRR(n, Spot, k, r, v, T, PutCall="P", OpStyle="A", mode="boundary")
+    print "American Put (rolling): %s" %(price)
+    print "Put exercise boundary: %s" %(boundary)
 #   print BinomialTreeCRR(n, Spot, k, r, v, T, PutCall="P", OpStyle="A")
 
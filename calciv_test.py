@@ -0,0 +1,234 @@
+#!/usr/bin/python
+
+import os
+import shutil
+import tempfile
+import unittest
+import Amop
+import BlackScholes
+import numpy as np
+import pandas as pd
+import CalcIV
+from CalcIV import IV
+import IVTable
+import OptionChain
+import SVI
+
+class CalcIVTest(unittest.TestCase):
+
+    S = 99.62
+    K = 100.0
+    rate = 0.01
+    time = 0.136986301369863
+    Cb = 3.45
+    Ca = 3.55
+    Pb = 4.15
+    Pa = 4.25
+
+    def test_iv_fmin(self):
+        iv = IV(self.S, self.K, self.Cb, self.Ca, self.Pb, self.Pa, self.rate, self.time)
+        iv.calc()
+        self.assertEqual(str(round(iv.sigma, 4)), "0.2609")
+
+    def test_iv_newton_brent(self):
+        for solver in ('newton', 'brent'):
+            iv = IV(self.S, self.K, self.Cb, self.Ca, self.Pb, self.Pa, self.rate, self.time, solver=solver)
+            iv.calc()
+            self.assertTrue(iv.converged)
+            self.assertEqual(iv.reason, None)
+            self.assertEqual(str(round(iv.sigma, 4)), "0.261")
+            self.assertTrue(iv.iterations < 20)
+            self.assertEqual(iv.Ctv, Amop.option_price_call_american_binomial(self.S, self.K, self.rate, iv.sigma, self.time, 100))
+
+    def test_iv_newton_single_leg(self):
+        price = Amop.option_price_put_american_binomial(self.S, self.K, self.rate, 0.35, self.time, 100)
+        iv = IV(self.S, self.K, 0, 0, price, price, self.rate, self.time, solver='newton', price_tol=1e-8)
+        iv.calc()
+        self.assertTrue(iv.converged)
+        self.assertAlmostEqual(iv.sigma, 0.35, 6)
+
+    def test_iv_failure_reasons(self):
+        for solver in ('newton', 'brent'):
+            # put quoted below intrinsic value
+            iv = IV(self.S, 120.0, 0, 0, 10.0, 10.0, self.rate, self.time, solver=solver)
+            iv.calc()
+            self.assertFalse(iv.converged)
+            self.assertTrue(iv.reason.startswith("no volatility"))
+            iv = IV(self.S, self.K, 0, 0, 0, 0, self.rate, self.time, solver=solver)
+            iv.calc()
+            self.assertFalse(iv.converged)
+            self.assertEqual(iv.reason, "no quotes")
+
+    def test_iv_chain(self):
+        res = CalcIV.iv_chain(self.S, self.K, self.Cb, self.Ca, self.Pb, self.Pa, self.rate, self.time)
+        iv = IV(self.S, self.K, self.Cb, self.Ca, self.Pb, self.Pa, self.rate, self.time, solver='newton')
+        iv.calc()
+        self.assertTrue(res.converged[0])
+        self.assertAlmostEqual(res.sigma[0], iv.sigma, 4)
+        # recover the volatilities a smile was priced with
+        K = np.linspace(70.0, 130.0, 61)
+        sigma = 0.2+0.1*((K-100.0)/30.0)**2
+        C = Amop.option_price_call_american_binomial_chain(100.0, K, self.rate, sigma, 0.25, 100)
+        P = Amop.option_price_put_american_binomial_chain(100.0, K, self.rate, sigma, 0.25, 100)
+        res = CalcIV.iv_chain(100.0, K, C, C, P, P, self.rate, 0.25, price_tol=1e-8)
+        self.assertTrue(res.converged.all())
+        self.assertTrue(np.abs(res.sigma-sigma).max() < 1e-5)
+        self.assertTrue(res.iterations.max() < 20)
+        # unquoted contracts are left alone
+        res = CalcIV.iv_chain(100.0, [90.0, 100.0], [0.0, 3.0], [0.0, 3.2], [0.0, 3.0], [0.0, 3.2], self.rate, 0.25)
+        self.assertEqual(list(res.converged), [False, True])
+        self.assertEqual(res.iterations[0], 0)
+
+    def test_implied_volatility_black_scholes(self):
+        K = np.array([60.0, 90.0, 100.0, 110.0, 160.0])
+        for call, pricer in ((True, BlackScholes.option_price_call_black_scholes),
+                             (False, BlackScholes.option_price_put_black_scholes)):
+            price = pricer(100.0, K, self.rate, 0.3, 0.5)
+            sigma = BlackScholes.option_implied_volatility_black_scholes(price, 100.0, K, self.rate, 0.5, call)
+            self.assertTrue(np.abs(sigma-0.3).max() < 1e-8)
+        # below intrinsic value
+        self.assertTrue(np.isnan(BlackScholes.option_implied_volatility_black_scholes(9.0, 90.0, 100.0, self.rate, 0.5, False)))
+
+    def test_iv_european(self):
+        iv = IV(self.S, self.K, self.Cb, self.Ca, self.Pb, self.Pa, self.rate, self.time, solver='european')
+        iv.calc()
+        self.assertTrue(iv.converged)
+        self.assertEqual(iv.iterations, 0) # no tree needed
+        self.assertEqual(str(round(iv.sigma, 3)), "0.261")
+        # against accurate tree prices
+        K = np.linspace(90.0, 110.0, 21)
+        sigma = 0.2+0.1*((K-100.0)/20.0)**2
+        C = Amop.option_price_call_american_binomial_chain(100.0, K, self.rate, sigma, 0.25, 1000)
+        P = Amop.option_price_put_american_binomial_chain(100.0, K, self.rate, sigma, 0.25, 1000)
+        res = CalcIV.iv_chain_european(100.0, K, C, C, P, P, self.rate, 0.25)
+        self.assertTrue(res.converged.all())
+        self.assertTrue(np.abs(res.sigma-sigma).max() < 1e-3)
+        # a large early exercise premium goes to the tree
+        P = Amop.option_price_put_american_binomial_chain(100.0, K, 0.08, sigma, 1.0, 100)
+        res = CalcIV.iv_chain_european(100.0, K, 0, 0, P, P, 0.08, 1.0, price_tol=1e-8)
+        self.assertTrue((res.iterations > 0).all())
+        self.assertTrue(np.abs(res.sigma-sigma).max() < 1e-5)
+
+    def test_iv_table(self):
+        path = tempfile.mkdtemp()
+        try:
+            IVTable.build_table(path, self.rate, np.linspace(-0.15, 0.15, 31), np.linspace(0.15, 0.35, 5),
+                                np.linspace(0.15, 0.4, 26))
+            table = IVTable.IVTable(path)
+            self.assertTrue(isinstance(table.prices, np.memmap))
+            K = np.linspace(90.0, 110.0, 21)
+            sigma = 0.2+0.1*((K-100.0)/20.0)**2
+            C = Amop.option_price_call_american_binomial_chain(100.0, K, self.rate, sigma, 0.25, 100)
+            P = Amop.option_price_put_american_binomial_chain(100.0, K, self.rate, sigma, 0.25, 100)
+            res = table.iv(100.0, K, C, C, P, P, 0.25)
+            self.assertTrue(res.converged.all())
+            self.assertTrue((res.iterations == 0).all())
+            self.assertTrue(np.abs(res.sigma-sigma).max() < 5e-3)
+            # outside the grid in time, solved with the tree
+            C = Amop.option_price_call_american_binomial_chain(100.0, K, self.rate, sigma, 0.75, 100)
+            res = table.iv(100.0, K, C, C, 0, 0, 0.75, price_tol=1e-8)
+            self.assertTrue((res.iterations > 0).all())
+            self.assertTrue(np.abs(res.sigma-sigma).max() < 1e-5)
+        finally:
+            shutil.rmtree(path)
+
+    def test_option_chain(self):
+        chain = OptionChain.OptionChain(['AAPL7141122P00100000', 'AAPL141122P00100000', 'AAPL141122C00100000',
+                                         'AAPL141122C00105000', 'AAPL141220P00100000', 'AAPL7141122C00100000'],
+                                        [4.10, self.Pb, self.Cb, 1.60, 5.10, 3.40], [4.30, self.Pa, self.Ca, 1.70, 5.30, 3.55],
+                                        self.S, '2014-10-03T15:59:00')
+        self.assertEqual(list(chain.roots), ['AAPL', 'AAPL7'])
+        self.assertEqual(chain.expiry.dtype, np.int32)
+        self.assertEqual(str(chain.expiry_dates()[0]), '2014-11-22')
+        group = chain.group('AAPL', '2014-11-22')
+        self.assertEqual(list(chain.strike[group]), [100.0, 100.0, 105.0])
+        self.assertEqual(list(chain.call[group]), [True, False, True])
+        pairs = chain.pair()
+        self.assertEqual(list(pairs.row), [2, 3, 5])
+        self.assertEqual(list(pairs.Pb), [self.Pb, 0.0, 4.10])
+        self.assertAlmostEqual(OptionChain.tau(pairs)[0], 49/365.0)
+        pairs, res = CalcIV.iv_option_chain(chain, self.rate)
+        iv = IV(self.S, self.K, self.Cb, self.Ca, self.Pb, self.Pa, self.rate, 49/365.0, solver='newton')
+        iv.calc()
+        self.assertAlmostEqual(res.sigma[0], iv.sigma, 4)
+        self.assertRaises(ValueError, OptionChain.parse_occ, ['AAPL'])
+
+    def test_option_chain_from_frame(self):
+        frame = pd.DataFrame({'Symbol': ['AAPL141122C00100000', 'AAPL141122P00100000'], 'Bid': [self.Cb, self.Pb],
+                              'Ask': [self.Ca, self.Pa], 'Underlying_Price': [self.S, self.S],
+                              'Quote_Time': ['10/3/2014 15:59', '10/3/2014 15:59']})
+        chain = OptionChain.from_frame(frame)
+        self.assertEqual(chain.quote_time[0], np.datetime64('2014-10-03T15:59'))
+        self.assertAlmostEqual(OptionChain.tau(chain.pair())[0], 49/365.0)
+
+    def test_svi(self):
+        truth = SVI.SVISurface('XYZ', 100.0, self.rate, [0.1, 0.5], [[0.004, 0.05, -0.4, 0.02, 0.1],
+                                                                      [0.02, 0.1, -0.3, 0.05, 0.2]])
+        K, T = np.meshgrid(np.linspace(70.0, 130.0, 41), truth.taus)
+        surface = SVI.fit_surface('XYZ', 100.0, self.rate, K.ravel(), T.ravel(), truth.iv(K.ravel(), T.ravel()))
+        self.assertTrue(np.abs(surface.params-truth.params).max() < 1e-5)
+        # total variance is interpolated linearly between the expiries
+        w = truth.total_variance(100.0, truth.taus)
+        self.assertAlmostEqual(surface.total_variance(100.0, 0.3), 0.5*(w[0]+w[1]), 8)
+        self.assertAlmostEqual(surface.iv(100.0, 1.0), surface.iv(100.0, 0.5), 8)
+        self.assertEqual(surface.iv(K, T).shape, K.shape)
+        path = os.path.join(tempfile.mkdtemp(), 'xyz.svi.npz')
+        try:
+            surface.save(path)
+            loaded = SVI.load_surface(path)
+            self.assertEqual(loaded.symbol, 'XYZ')
+            self.assertEqual(list(loaded.iv(K[0], 0.2)), list(surface.iv(K[0], 0.2)))
+        finally:
+            shutil.rmtree(os.path.dirname(path))
+
+    def test_svi_fit_surfaces(self):
+        truth = SVI.SVISurface('XYZ', 100.0, self.rate, [0.1, 0.5], [[0.004, 0.05, -0.4, 0.02, 0.1],
+                                                                      [0.02, 0.1, -0.3, 0.05, 0.2]])
+        K, T = np.meshgrid(np.linspace(70.0, 130.0, 41), truth.taus)
+        n = K.size
+        frame = pd.DataFrame({'Sym': ['XYZ']*n + ['ABC']*3 + ['DEF']*3,
+                              'Strike': np.append(K.ravel(), [95.0, 100.0, 105.0]*2),
+                              'Tau': np.append(T.ravel(), [0.1]*6),
+                              'IV': np.append(truth.iv(K.ravel(), T.ravel()), [0.3]*6),
+                              'Underlying_Price': 100.0,
+                              'Bid_c': [1.0]*n + [0.0]*3 + [1.0]*3,
+                              'Bid_p': 0.0})
+        # ABC has no bid, DEF too few IVs; the rows of the symbols interleaved
+        frame = frame.iloc[np.random.RandomState(0).permutation(len(frame))]
+        surfaces = SVI.fit_surfaces(frame, self.rate)
+        self.assertEqual(surfaces.keys(), ['XYZ'])
+        self.assertTrue(np.abs(surfaces['XYZ'].params-truth.params).max() < 1e-5)
+
+    def test_warm_iv(self):
+        K = np.linspace(80.0, 120.0, 21)
+        sigma = 0.2+0.1*((K-100.0)/20.0)**2
+        C = Amop.option_price_call_american_binomial_chain(100.0, K, self.rate, sigma, 0.25, 100)
+        P = Amop.option_price_put_american_binomial_chain(100.0, K, self.rate, sigma, 0.25, 100)
+        keys = [('XYZ', '2014-12-20', k) for k in K]
+        warm = CalcIV.WarmIV(price_tol=1e-8)
+        cold = warm.update(keys[::2], 100.0, K[::2], C[::2], C[::2], P[::2], P[::2], self.rate, 0.25)
+        self.assertEqual(warm.solved, 11)
+        # unchanged contracts are carried over, the new strikes start from their neighbours
+        res = warm.update(keys, 100.0, K, C, C, P, P, self.rate, 0.25)
+        self.assertEqual((warm.solved, warm.skipped), (10, 11))
+        self.assertTrue((res.iterations[::2] == 0).all())
+        self.assertEqual(list(res.sigma[::2]), list(cold.sigma))
+        self.assertTrue(np.abs(res.sigma-sigma).max() < 1e-5)
+        self.assertTrue(res.iterations[1::2].sum() <= cold.iterations.sum())
+        # only the moved quote is solved again
+        C[5] += 0.05
+        res = warm.update(keys, 100.0, K, C, C, P, P, self.rate, 0.25)
+        self.assertEqual(warm.solved, 1)
+        self.assertEqual(list(np.flatnonzero(warm.changed)), [5])
+        self.assertTrue(res.sigma[5] > sigma[5])
+        self.assertTrue(res.converged.all())
+        # underlying moves within spot_tol keep the last solve
+        warm.spot_tol = 1e-3
+        warm.update(keys, 100.05, K, C, C, P, P, self.rate, 0.25)
+        self.assertEqual(warm.solved, 0)
+        warm.update(keys, 100.5, K, C, C, P, P, self.rate, 0.25)
+        self.assertEqual(warm.solved, len(K))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+#!/usr/bin/python
+
+import StringIO
+import unittest
+import numpy as np
+import pandas as pd
+from orderBook import OrderBook
+from tradeBook import SCHEMA
+
+TICKS = """34200000,Q,XYZ,N,B,100.00,500,1
+34200000,Q,XYZ,N,B,99.99,900,5
+34200000,Q,XYZ,N,A,100.03,900,6
+34200010,Q,XYZ,N,A,100.02,500,4
+34200010,P,XYZ,N,100.02,200,,
+34200011,Q,XYZ,N,A,100.02,0,0
+34200011,Q,XYZ,N,B,99.98,300,2
+34200025,Q,XYZ,N,B,100.03,100,1
+34200030,Q,XYZ,N,A,100.05,200,3
+"""
+
+class OrderBookTest(unittest.TestCase):
+
+    def ticks(self):
+        return pd.read_csv(StringIO.StringIO(TICKS), index_col=0, header=None, dtype=SCHEMA)
+
+    def test_depth(self):
+        book = OrderBook(levels=2)
+        snaps = pd.concat([book.replay(self.ticks()), book.flush()])
+        self.assertEqual(list(snaps.index), [34200000, 34200010, 34200011, 34200025, 34200030])
+        self.assertEqual(list(snaps.loc[34200000, ['bprice1', 'bsize1', 'bprice2', 'aprice1']]), [100.0, 500, 99.99, 100.03])
+        self.assertEqual(snaps.loc[34200010, 'aprice1'], 100.02)
+        self.assertEqual(list(snaps.loc[34200011, ['aprice1', 'asize1', 'aorders1']]), [100.03, 900, 6])
+        self.assertTrue(np.isnan(snaps.loc[34200011, 'aprice2']))
+        # the bid at 100.03 crosses the ask level, which is dropped
+        self.assertEqual(list(snaps.loc[34200030, ['bprice1', 'bprice2', 'aprice1']]), [100.03, 100.0, 100.05])
+        self.assertTrue(np.isnan(snaps.loc[34200025, 'aprice1']))
+        self.assertEqual(book.updates, 8)
+
+    def test_update(self):
+        book = OrderBook(levels=2)
+        book.update(True, 100.0, 500, 1)
+        book.update(True, 99.99, 900, 5)
+        book.update(True, 100.01, 200, 2)
+        book.update(False, 100.03, 300, 3)
+        book.update(True, 100.01, 0, 0)
+        depth = book.depth()
+        self.assertEqual(list(depth[:9]), [100.0, 500, 1, 99.99, 900, 5, 100.03, 300, 3])
+        self.assertTrue(np.isnan(depth[9:]).all())
+        self.assertEqual(len(book.bids), 2)
+
+    def test_depth_chunks_and_interval(self):
+        d = self.ticks()
+        whole = OrderBook(levels=3, interval=10)
+        expected = pd.concat([whole.replay(d), whole.flush()])
+        self.assertEqual(list(expected.index), [34200000, 34200010, 34200020, 34200030])
+        chunked = OrderBook(levels=3, interval=10)
+        snaps = pd.concat([chunked.replay(d.iloc[i:i+2]) for i in xrange(0, len(d), 2)] + [chunked.flush()])
+        self.assertTrue(expected.equals(snaps))
+
+
+if __name__ == '__main__':
+    unittest.main()
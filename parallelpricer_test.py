@@ -0,0 +1,63 @@
+#!/usr/bin/python
+
+import unittest
+import Amop
+from CalcIV import IV
+from ParallelPricer import PricingPool
+
+class PricingPoolTest(unittest.TestCase):
+
+    S = 99.62
+    rate = 0.01
+    time = 0.136986301369863
+
+    def jobs(self):
+        return [(100.0, K, 0.01, 0.3, 0.5, 50) for K in (90.0, 95.0, 100.0, 105.0, 110.0, 115.0)]
+
+    def test_price_in_order(self):
+        expected = [Amop.option_price_put_american_binomial(*job) for job in self.jobs()]
+        pool = PricingPool(processes=2, min_parallel=1)
+        try:
+            self.assertEqual(pool.price(Amop.option_price_put_american_binomial, self.jobs()), expected)
+            self.assertTrue(pool.pool is not None)
+        finally:
+            pool.close()
+
+    def test_in_process(self):
+        expected = [Amop.option_price_put_american_binomial(*job) for job in self.jobs()]
+        for pool in (PricingPool(processes=1, min_parallel=1), PricingPool(processes=2, min_parallel=64)):
+            self.assertEqual(pool.price(Amop.option_price_put_american_binomial, self.jobs()), expected)
+            self.assertTrue(pool.pool is None)
+
+    def test_default_method(self):
+        pool = PricingPool(processes=2, min_parallel=1)
+        try:
+            pool.price(Amop.option_price_put_american_binomial, self.jobs()) # fork the workers
+            Amop.set_default_method('lr')
+            try:
+                expected = [Amop.option_price_put_american_binomial(*job) for job in self.jobs()]
+                self.assertEqual(pool.price(Amop.option_price_put_american_binomial, self.jobs()), expected)
+            finally:
+                Amop.set_default_method('crr')
+        finally:
+            pool.close()
+
+    def test_solve(self):
+        expected = []
+        for K in (95.0, 100.0, 105.0):
+            iv = IV(self.S, K, 3.45, 3.55, 4.15, 4.25, self.rate, self.time, amop_steps=20)
+            iv.calc()
+            expected.append((iv.sigma, iv.Ctv, iv.Ptv))
+        for processes in (1, 2):
+            ivs = [IV(self.S, K, 3.45, 3.55, 4.15, 4.25, self.rate, self.time, amop_steps=20) for K in (95.0, 100.0, 105.0)]
+            pool = PricingPool(processes=processes, min_parallel=1)
+            try:
+                solved = pool.solve(ivs)
+            finally:
+                pool.close()
+            self.assertTrue(solved is ivs)
+            self.assertEqual([(iv.sigma, iv.Ctv, iv.Ptv) for iv in ivs], expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,16 +1,110 @@
 #!/usr/bin/python
 
+# Plot IV surfaces, .ivs csv or .ivb files.
+#   plot3d.py <input>                 scatter of every row, interactive
+#   plot3d.py <input> --out <dir>     one surface mesh image per symbol, headless
+# For the images the points are averaged onto a (tau, strike) grid first, so
+# the drawing time is set by the grid and not by the number of rows.
+
+import os
 import sys
+
+import numpy as np
 import pandas as pd
+import matplotlib
+if ('--out' in sys.argv):
+    matplotlib.use('Agg') # headless batch rendering, before pyplot is imported
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 
+import SurfaceFile
+
+def bin_surface(tau, strike, iv, tau_bins=30, strike_bins=40):
+    """Average IV on a regular (tau, strike) grid.
+    Empty cells are filled by interpolating along the strikes of their tau row;
+    rows without any point are dropped.
+    @return: (tau centres, strike centres, (taus, strikes) array of IV), None
+             when no point has an IV
+    """
+    tau, strike, iv = [np.asarray(x, dtype=float) for x in (tau, strike, iv)]
+    good = np.isfinite(iv) & (iv > 0)
+    if (not good.any()):
+        return None
+    tau, strike, iv = tau[good], strike[good], iv[good]
+    tau_edges = np.linspace(tau.min(), tau.max(), tau_bins+1)
+    strike_edges = np.linspace(strike.min(), strike.max(), strike_bins+1)
+    i = np.clip(np.searchsorted(tau_edges, tau, side='right')-1, 0, tau_bins-1)
+    j = np.clip(np.searchsorted(strike_edges, strike, side='right')-1, 0, strike_bins-1)
+    cells = i*strike_bins + j
+    count = np.bincount(cells, minlength=tau_bins*strike_bins)
+    total = np.bincount(cells, weights=iv, minlength=tau_bins*strike_bins)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        grid = (total/count).reshape(tau_bins, strike_bins)
+    strikes = 0.5*(strike_edges[1:]+strike_edges[:-1])
+    taus = 0.5*(tau_edges[1:]+tau_edges[:-1])
+    rows = []
+    for row in grid:
+        filled = np.isfinite(row)
+        rows.append(filled.any())
+        if (filled.any() and not filled.all()):
+            row[~filled] = np.interp(strikes[~filled], strikes[filled], row[filled])
+    rows = np.array(rows)
+    return taus[rows], strikes, grid[rows]
+
+def render_surfaces(df, out_dir, tau_bins=30, strike_bins=40, fmt='png'):
+    """Draw the binned surface of every symbol to <out_dir>/<symbol>.<fmt>
+    Symbols without any IV are skipped.
+    @param df: frame or .ivb records with Sym, Tau, Strike and IV columns
+    @return: list of the files written
+    """
+    if (not os.path.isdir(out_dir)):
+        os.makedirs(out_dir)
+    sym = np.asarray(df['Sym'])
+    tau, strike, iv = [np.asarray(df[c], dtype=float) for c in ('Tau', 'Strike', 'IV')]
+    written = []
+    symbols, codes = np.unique(sym, return_inverse=True)
+    order = np.argsort(codes, kind='mergesort') # rows of each symbol together, in input order
+    bounds = np.searchsorted(codes[order], np.arange(len(symbols)+1))
+    for j, symbol in enumerate(symbols):
+        rows = order[bounds[j]:bounds[j+1]]
+        binned = bin_surface(tau[rows], strike[rows], iv[rows], tau_bins, strike_bins)
+        if (binned is None):
+            continue
+        taus, strikes, grid = binned
+        fig = plt.figure()
+        ax = fig.gca(projection='3d')
+        if (len(taus) > 1):
+            K, T = np.meshgrid(strikes, taus)
+            ax.plot_surface(T, K, grid, cmap='viridis', rstride=1, cstride=1, linewidth=0)
+        else: # a single expiry is a smile
+            ax.plot(np.repeat(taus, len(strikes)), strikes, grid.ravel())
+        ax.set_xlabel('Tau')
+        ax.set_ylabel('Strike')
+        ax.set_zlabel('IV')
+        ax.set_title(symbol)
+        path = os.path.join(out_dir, '%s.%s' % (symbol, fmt))
+        fig.savefig(path)
+        plt.close(fig)
+        written.append(path)
+    return written
+
+def read(path):
+    if (path.endswith('.ivb')): # binary surface file, the columns are fields of the records
+        header, df = SurfaceFile.read_surface(path)
+        return df
+    return pd.read_csv(path)
+
 if __name__ == '__main__':
     if (len(sys.argv) < 2):
-        print "need input"
+        print "need input [--out <dir>]"
         sys.exit(1)
 
-    df = pd.read_csv(sys.argv[1])
+    df = read(sys.argv[1])
+    if ('--out' in sys.argv):
+        for path in render_surfaces(df, sys.argv[sys.argv.index('--out')+1]):
+            print 'writing to - ', path
+        sys.exit(0)
+
     threedee = plt.figure().gca(projection='3d')
     threedee.scatter(df['Tau'], df['Strike'], df['IV'])
     threedee.set_xlabel('Tau')
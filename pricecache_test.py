@@ -0,0 +1,84 @@
+#!/usr/bin/python
+
+import pickle
+import unittest
+import Amop
+from CalcIV import IV
+from ParallelPricer import PricingPool
+from PriceCache import PriceCache
+
+class PriceCacheTest(unittest.TestCase):
+
+    def test_hits(self):
+        cache = PriceCache()
+        put = cache.wrap(Amop.option_price_put_american_binomial)
+        self.assertTrue(cache.wrap(Amop.option_price_put_american_binomial) is put)
+        first = put(100.0, 100.0, 0.01, 0.3, 0.5, 50)
+        self.assertEqual(put(100.0, 100.0, 0.01, 0.3, 0.5, steps=50), first)
+        self.assertEqual(first, Amop.option_price_put_american_binomial(100.0, 100.0, 0.01, 0.3, 0.5, 50))
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 1, 1))
+
+    def test_default_method(self):
+        cache = PriceCache()
+        put = cache.wrap(Amop.option_price_put_american_binomial)
+        crr = put(100.0, 100.0, 0.01, 0.3, 0.5, 50)
+        Amop.set_default_method('baw')
+        try:
+            baw = put(100.0, 100.0, 0.01, 0.3, 0.5, 50)
+        finally:
+            Amop.set_default_method('crr')
+        self.assertEqual(baw, Amop.option_price_put_american_binomial(100.0, 100.0, 0.01, 0.3, 0.5, 50, method='baw'))
+        self.assertNotEqual(baw, crr)
+        self.assertEqual(put(100.0, 100.0, 0.01, 0.3, 0.5, 50), crr)
+        self.assertEqual(cache.misses, 2)
+
+    def test_lru_eviction(self):
+        cache = PriceCache(max_entries=2)
+        put = cache.wrap(Amop.option_price_put_american_binomial)
+        put(100.0, 95.0, 0.01, 0.3, 0.5, 20)
+        put(100.0, 100.0, 0.01, 0.3, 0.5, 20)
+        put(100.0, 95.0, 0.01, 0.3, 0.5, 20) # 95 is now the most recently used
+        put(100.0, 105.0, 0.01, 0.3, 0.5, 20) # evicts 100
+        self.assertEqual(cache.evictions, 1)
+        put(100.0, 95.0, 0.01, 0.3, 0.5, 20)
+        self.assertEqual(cache.hits, 2)
+        put(100.0, 100.0, 0.01, 0.3, 0.5, 20)
+        self.assertEqual(cache.misses, 4)
+        self.assertEqual(len(cache.entries), 2)
+
+    def test_quantization(self):
+        cache = PriceCache(quanta={'sigma': 1e-3})
+        put = cache.wrap(Amop.option_price_put_american_binomial)
+        value = put(100.0, 100.0, 0.01, 0.3004, 0.5, 20)
+        self.assertEqual(value, Amop.option_price_put_american_binomial(100.0, 100.0, 0.01, 0.3, 0.5, 20))
+        self.assertEqual(put(100.0, 100.0, 0.01, 0.2996, 0.5, 20), value)
+        self.assertEqual(cache.hits, 1)
+        put(100.0, 100.0, 0.01, 0.3006, 0.5, 20)
+        self.assertEqual(cache.misses, 2)
+        exact = PriceCache(quanta={'S': 0})
+        call = exact.wrap(Amop.option_price_call_american_binomial)
+        call(100.0, 100.0, 0.01, 0.3, 0.5, 20)
+        call(100.00001, 100.0, 0.01, 0.3, 0.5, 20)
+        self.assertEqual(exact.misses, 2)
+
+    def test_pickle(self):
+        cache = PriceCache()
+        iv = IV(99.62, 100.0, 3.45, 3.55, 4.15, 4.25, 0.01, 0.136986301369863, amop_steps=20, cache=cache)
+        iv.calc()
+        copy = pickle.loads(pickle.dumps(iv))
+        self.assertEqual(copy.cache.stats(), cache.stats())
+        self.assertEqual(copy.cache.wrapped, {})
+        ivs = [IV(99.62, K, 3.45, 3.55, 4.15, 4.25, 0.01, 0.136986301369863, amop_steps=20, cache=cache)
+               for K in (95.0, 100.0)]
+        pool = PricingPool(processes=2, min_parallel=1)
+        try:
+            pool.solve(ivs)
+        finally:
+            pool.close()
+        self.assertTrue(all(x.cache is cache for x in ivs))
+        self.assertAlmostEqual(ivs[1].sigma, iv.sigma, 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
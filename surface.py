@@ -6,17 +6,19 @@ import datetime
 import sys
 
 import Amop
-from CalcIV import IV
+from CalcIV import IV, iv_chain, WarmIV
+from ParallelPricer import PricingPool
+import OptionChain
+import SurfaceFile
 
 def join_options(calls, puts):
     c = pd.DataFrame(calls[['Quote_Time', 'Underlying_Price', 'Strike', 'Symbol', 'Bid', 'Ask']], copy=True)
     p = pd.DataFrame(puts[['Quote_Time', 'Underlying_Price', 'Strike', 'Symbol', 'Bid', 'Ask']], copy=True)
-    c['Expiry'] = pd.to_datetime(`20` + c['Symbol'].apply(lambda x: x[-15:-9]) )
-    c['Quote_Time'] = pd.to_datetime(c['Quote_Time'])
-    c['Sym'] = c['Symbol'].apply(lambda x: x[:-15])
-    p['Expiry'] = pd.to_datetime(`20` + p['Symbol'].apply(lambda x: x[-15:-9]) )
-    p['Quote_Time'] = pd.to_datetime(p['Quote_Time'])
-    p['Sym'] = p['Symbol'].apply(lambda x: x[:-15])
+    for o in (c, p):
+        roots, root, expiry, call, strike = OptionChain.parse_occ(o['Symbol'].values)
+        o['Expiry'] = OptionChain.EPOCH + expiry
+        o['Quote_Time'] = pd.to_datetime(o['Quote_Time'])
+        o['Sym'] = roots[root]
     c = c.set_index(['Sym', 'Quote_Time', 'Underlying_Price', 'Expiry', 'Strike'])
     p = p.set_index(['Sym', 'Quote_Time', 'Underlying_Price', 'Expiry', 'Strike'])
     st = c.join(p, lsuffix='_c', rsuffix='_p')
@@ -25,42 +27,224 @@ def join_options(calls, puts):
 
     return st
 
-def ivs(st, r):
-    st['Tau'] = -1
-    st['IV'] = -1
-    st['TV_c'] = -1
-    st['TV_p'] = -1
-    st = st.fillna(0)
-    for i in st.index:
-        t = (i[3] - i[1]).days / 365.0
-        S = i[2]
-        K = i[4]
-        d = st.loc[i]
-        iv = IV(S, K, d[0], d[1], d[2], d[3], r, t)
+def _solve_group(S, K, Cb, Ca, Pb, Pa, r, tau, solver='fmin'):
+    """IVs of the contracts of one (symbol, expiry) group
+    @return: (n, 3) array of IV, TV_c, TV_p
+    """
+    out = np.empty((len(K), 3))
+    if (solver == 'chain'):
+        res = iv_chain(S, K, Cb, Ca, Pb, Pa, r, tau)
+        out[:, 0], out[:, 1], out[:, 2] = res.sigma, res.Ctv, res.Ptv
+        return out
+    for n in xrange(0, len(K)):
+        iv = IV(S[n], K[n], Cb[n], Ca[n], Pb[n], Pa[n], r, tau[n])
         iv.calc()
-        d[4] = t
-        d[5] = iv.sigma
-        d[6] = iv.Ctv
-        d[7] = iv.Ptv
-        st.loc[i] = d
+        out[n] = iv.sigma, iv.Ctv, iv.Ptv
+    return out
+
+def ivs(st, r, pool=None, solver='fmin'):
+    """IVs of the joined chain (join_options), one row per contract.
+    The quotes are pulled into NumPy columns and the (symbol, expiry) groups are
+    solved concurrently on a ParallelPricer.PricingPool.
+    @param st: joined calls and puts
+    @param r: interest rate
+    @param pool: PricingPool to use, by default one over all cores for this call
+    @param solver: 'fmin' to solve each contract with CalcIV.IV, 'chain' to solve 
+                   each group at once with CalcIV.iv_chain
+    @return: DataFrame of Bid_c, TV_c, Ask_c, IV, Tau, Bid_p, TV_p, Ask_p
+    """
+    st = st.fillna(0)
+    index = st.index
+    quote_time = index.get_level_values('Quote_Time').values
+    expiry = index.get_level_values('Expiry').values
+    tau = ((expiry - quote_time) // np.timedelta64(1, 'D')) / 365.0 # whole days
+    S = index.get_level_values('Underlying_Price').values.astype(float)
+    K = index.get_level_values('Strike').values.astype(float)
+    Cb, Ca, Pb, Pa = [st[c].values.astype(float) for c in ('Bid_c', 'Ask_c', 'Bid_p', 'Ask_p')]
+    groups = pd.DataFrame({'Sym': index.get_level_values('Sym'), 'Expiry': expiry}).groupby(['Sym', 'Expiry']).indices
+    result = _solve(groups.values(), S, K, Cb, Ca, Pb, Pa, r, tau, pool, solver)
+    return _frame(index, Cb, Ca, Pb, Pa, tau, result)
+
+def ivs_chain(chain, r, pool=None, solver='fmin'):
+    """IVs of an OptionChain.OptionChain, as ivs() of the joined chain: one row per
+    call, paired with its put, in the order of the calls in the input.
+    @param chain: OptionChain of calls and puts
+    @param r: interest rate
+    @param pool: PricingPool to use, by default one over all cores for this call
+    @param solver: 'fmin' or 'chain', as for ivs()
+    @return: DataFrame of Bid_c, TV_c, Ask_c, IV, Tau, Bid_p, TV_p, Ask_p
+    """
+    pairs = chain.pair()
+    tau = OptionChain.tau(pairs)
+    # the pairs are sorted by (root, expiry), so each group is a range
+    starts = np.flatnonzero(np.r_[True, (pairs.root[1:] != pairs.root[:-1]) | (pairs.expiry[1:] != pairs.expiry[:-1])])
+    stops = np.r_[starts[1:], len(tau)]
+    groups = [np.arange(a, b) for (a, b) in zip(starts, stops)]
+    result = _solve(groups, pairs.underlying, pairs.strike, pairs.Cb, pairs.Ca, pairs.Pb, pairs.Pa, r, tau, pool, solver)
+    order = np.argsort(pairs.row, kind='mergesort') # back to input order
+    index = pd.MultiIndex.from_arrays([chain.roots[pairs.root][order], pairs.quote_time[order], pairs.underlying[order],
+                                       chain.expiry_dates(pairs.expiry[order]).astype('datetime64[ns]'), pairs.strike[order]],
+                                      names=['Sym', 'Quote_Time', 'Underlying_Price', 'Expiry', 'Strike'])
+    return _frame(index, pairs.Cb[order], pairs.Ca[order], pairs.Pb[order], pairs.Pa[order], tau[order], result[order])
 
-    out = st[['Bid_c', 'TV_c', 'Ask_c', 'IV', 'Tau', 'Bid_p', 'TV_p', 'Ask_p']]
+def _solve(rows, S, K, Cb, Ca, Pb, Pa, r, tau, pool, solver):
+    """Solve the groups (arrays of row numbers) on the pool, @return: (n, 3) array of IV, TV_c, TV_p"""
+    jobs = [(S[g], K[g], Cb[g], Ca[g], Pb[g], Pa[g], r, tau[g], solver) for g in rows]
+    own_pool = pool is None
+    if own_pool:
+        pool = PricingPool(min_parallel=2)
+    try:
+        solved = pool.price(_solve_group, jobs)
+    finally:
+        if own_pool:
+            pool.close()
+    result = np.empty((len(K), 3))
+    for g, out in zip(rows, solved):
+        result[g] = out
+    return result
+
+def _frame(index, Cb, Ca, Pb, Pa, tau, result):
+    out = pd.DataFrame({'Bid_c': Cb, 'TV_c': result[:, 1], 'Ask_c': Ca, 'IV': result[:, 0], 'Tau': tau,
+                        'Bid_p': Pb, 'TV_p': result[:, 2], 'Ask_p': Pa}, index=index,
+                       columns=['Bid_c', 'TV_c', 'Ask_c', 'IV', 'Tau', 'Bid_p', 'TV_p', 'Ask_p'])
     return out
 
+class LiveSurface:
+    """IV surface kept up to date across chain snapshots (e.g. from the
+    mktDataServer poller). Contracts are matched by (symbol, expiry, strike);
+    a snapshot re-solves only the contracts whose quotes changed, which are new, 
+    or whose underlying (relative move) or time to expiry moved past spot_tol or 
+    time_tol since they were solved (CalcIV.WarmIV, seeded from the last solve).
+    Subscribers get the changed rows of every update.
+    """
+
+    def __init__(self, r, spot_tol=1e-3, time_tol=0.5/365.0, amop_steps=100):
+        """
+        @param r: interest rate
+        @param spot_tol: relative underlying move which re-solves a contract
+        @param time_tol: change of the time to expiry which re-solves a contract
+        @param amop_steps: lattice steps of the solves
+        """
+        self.r = r
+        self.warm = WarmIV(amop_steps, spot_tol=spot_tol, time_tol=time_tol)
+        self.surface = None # the latest surface, as ivs_chain returns it
+        self.subscribers = []
+
+    def subscribe(self, callback):
+        """Call callback(delta, removed) after every update, with the DataFrame of the
+        changed rows (ivs_chain columns) and the list of (symbol, expiry, strike) 
+        keys of the contracts gone from the snapshot, expiry in days since 1970-01-01"""
+        self.subscribers.append(callback)
+
+    def update(self, chain):
+        """Bring the surface up to date with a snapshot
+        @param chain: OptionChain.OptionChain of the snapshot (e.g. OptionChain.from_frame)
+        @return: (delta, removed), as passed to the subscribers
+        """
+        pairs = chain.pair()
+        order = np.argsort(pairs.row, kind='mergesort') # input order of the calls, as ivs_chain
+        pairs = OptionChain.Pairs(*[x[order] for x in pairs])
+        tau = OptionChain.tau(pairs)
+        symbols = chain.roots[pairs.root]
+        keys = zip(symbols, pairs.expiry, pairs.strike)
+        res = self.warm.update(keys, pairs.underlying, pairs.strike, pairs.Cb, pairs.Ca, pairs.Pb, pairs.Pa,
+                               self.r, tau)
+        removed = list(set(self.warm.state) - set(keys))
+        self.warm.forget(removed)
+        index = pd.MultiIndex.from_arrays([symbols, pairs.quote_time, pairs.underlying,
+                                           chain.expiry_dates(pairs.expiry).astype('datetime64[ns]'), pairs.strike],
+                                          names=['Sym', 'Quote_Time', 'Underlying_Price', 'Expiry', 'Strike'])
+        result = np.column_stack((res.sigma, res.Ctv, res.Ptv))
+        self.surface = _frame(index, pairs.Cb, pairs.Ca, pairs.Pb, pairs.Pa, tau, result)
+        delta = self.surface[self.warm.changed]
+        for callback in self.subscribers:
+            callback(delta, removed)
+        return delta, removed
+
+STREAM_COLUMNS = ['Quote_Time', 'Underlying_Price', 'Symbol', 'Bid', 'Ask', 'IsNonstandard']
+
+def _trailing_group(chunk):
+    """Start of the last (root, quote time) run of rows in the chunk"""
+    roots, root, expiry, call, strike = OptionChain.parse_occ(chunk['Symbol'].values)
+    quote_time = chunk['Quote_Time'].values
+    same = (root == root[-1]) & (quote_time == quote_time[-1])
+    different = np.flatnonzero(~same)
+    return different[-1]+1 if len(different) else 0
+
+def stream_ivs(path, out_path, r, chunk_rows=100000, pool=None, solver='fmin'):
+    """ivs_chain over a market data file too large for memory.
+    The file is read chunk_rows rows at a time and solved one block of whole 
+    (root, quote time) groups at a time: the rows of the last group of a chunk, 
+    which may go on in the next chunk, are held back until the group is complete.
+    The rows of a group must be contiguous in the file, as in the snapshot dumps. 
+    Peak memory is set by the chunk size and the largest group.
+    @param path: market data csv, as read by surface.py
+    @param out_path: .ivs file to write, the output of ivs_chain appended block by block,
+                     or a binary .ivb surface file (SurfaceFile)
+    @param r: interest rate
+    @param chunk_rows: rows read at a time
+    @param pool: PricingPool to use, by default one over all cores for this call
+    @param solver: 'fmin' or 'chain', as for ivs()
+    @return: number of rows written
+    """
+    own_pool = pool is None
+    if own_pool:
+        pool = PricingPool(min_parallel=2)
+    written = 0
+    header = True
+    held = None
+    out = SurfaceFile.SurfaceWriter(out_path, r) if out_path.endswith('.ivb') else open(out_path, 'w')
+    try:
+        for chunk in pd.read_csv(path, usecols=STREAM_COLUMNS, chunksize=chunk_rows):
+            chunk = chunk[chunk['IsNonstandard'] == False] # remove non-standards
+            if (held is not None):
+                chunk = pd.concat([held, chunk], ignore_index=True)
+            if (len(chunk) == 0):
+                continue
+            start = _trailing_group(chunk)
+            held = chunk.iloc[start:]
+            block = chunk.iloc[:start]
+            if (len(block) > 0):
+                written += _write_block(block, out, r, pool, solver, header)
+                header = False
+        if (held is not None and len(held) > 0):
+            written += _write_block(held, out, r, pool, solver, header)
+    finally:
+        out.close()
+        if own_pool:
+            pool.close()
+    return written
+
+def _write_block(block, out, r, pool, solver, header):
+    opt_ivs = ivs_chain(OptionChain.from_frame(block), r, pool, solver)
+    if isinstance(out, SurfaceFile.SurfaceWriter):
+        out.append(opt_ivs)
+    else:
+        opt_ivs.to_csv(out, header=header, float_format='%.4f')
+    return len(opt_ivs)
+
 if __name__ == '__main__':
-    if (len(sys.argv) < 2):
-        print "need input"
+    binary = '--binary' in sys.argv # write a .ivb surface file instead of the .ivs csv
+    args = [a for a in sys.argv if a != '--binary']
+    if (len(args) < 2):
+        print "need input [chunk_rows, to stream the input] [--binary]"
         sys.exit(1)
 
-    mktData = pd.read_csv(sys.argv[1])
-    mktData = mktData[mktData['IsNonstandard'] == False] # remove non-standards
     r = 0.01
-    #print mktData
-    calls = mktData[mktData['Type'] == 'call']
-    puts = mktData[mktData['Type'] == 'put']
+    out_path = args[1] + ('.ivb' if binary else '.ivs')
+    if (len(args) > 2):
+        print 'streaming to - ', out_path
+        stream_ivs(args[1], out_path, r, int(args[2]))
+        sys.exit(0)
 
-    opt = join_options(calls, puts)
-    opt_ivs = ivs(opt, r)
+    mktData = pd.read_csv(args[1])
+    mktData = mktData[mktData['IsNonstandard'] == False] # remove non-standards
+    #print mktData
+    chain = OptionChain.from_frame(mktData)
+    opt_ivs = ivs_chain(chain, r)
 
-    print 'writing to - ', sys.argv[1] + '.ivs'
-    opt_ivs.to_csv(sys.argv[1] + '.ivs', float_format='%.4f')
+    print 'writing to - ', out_path
+    if binary:
+        SurfaceFile.write_surface(out_path, opt_ivs, r)
+    else:
+        opt_ivs.to_csv(out_path, float_format='%.4f')
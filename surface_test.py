@@ -0,0 +1,181 @@
+#!/usr/bin/python
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+import matplotlib
+matplotlib.use('Agg')
+import Amop
+from CalcIV import IV
+import OptionChain
+from ParallelPricer import PricingPool
+import plot3d
+import surface
+import SurfaceFile
+
+def market_frame(quote_time='2014-10-03 15:59:00'):
+    """Quotes of a small chain, as surface.py reads them"""
+    rows = []
+    for sym, S, expiry, days, strikes in (('AAPL', 99.62, '141122', 49, (95.0, 100.0, 105.0)),
+                                          ('SPY', 190.3, '141220', 77, (185.0, 190.0))):
+        for K in strikes:
+            sigma = 0.25+0.002*abs(K-S)
+            for cp, price in (('C', Amop.option_price_call_american_binomial), ('P', Amop.option_price_put_american_binomial)):
+                value = price(S, K, 0.01, sigma, days/365.0, 100)
+                rows.append({'Quote_Time': quote_time, 'Underlying_Price': S, 'Strike': K,
+                             'Symbol': '%s%s%s%08d' % (sym, expiry, cp, int(K*1000)), 'Bid': round(value-0.05, 2),
+                             'Ask': round(value+0.05, 2), 'IsNonstandard': False})
+    return pd.DataFrame(rows, columns=['Quote_Time', 'Underlying_Price', 'Strike', 'Symbol', 'Bid', 'Ask', 'IsNonstandard'])
+
+class SurfaceTest(unittest.TestCase):
+
+    rate = 0.01
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.pool = PricingPool(processes=1)
+
+    def tearDown(self):
+        self.pool.close()
+        shutil.rmtree(self.dir)
+
+    def test_ivs(self):
+        frame = market_frame()
+        calls = frame[frame['Symbol'].str.contains('C0')]
+        puts = frame[frame['Symbol'].str.contains('P0')]
+        result = surface.ivs(surface.join_options(calls, puts), self.rate, self.pool)
+        self.assertEqual(len(result), 5)
+        for (sym, quote_time, S, expiry, K), row in result.iterrows():
+            tau = (expiry - quote_time).days/365.0
+            self.assertEqual(row['Tau'], tau)
+            iv = IV(S, K, row['Bid_c'], row['Ask_c'], row['Bid_p'], row['Ask_p'], self.rate, tau)
+            iv.calc()
+            self.assertEqual((row['IV'], row['TV_c'], row['TV_p']), (iv.sigma, iv.Ctv, iv.Ptv))
+        chain = surface.ivs_chain(OptionChain.from_frame(frame), self.rate, self.pool)
+        self.assertTrue((chain.values == result.values).all())
+        self.assertEqual(list(chain.index.get_level_values('Strike')), list(result.index.get_level_values('Strike')))
+
+    def surface_frame(self):
+        index = pd.MultiIndex.from_arrays([['AAPL', 'AAPL', 'SPY'],
+                                           pd.to_datetime(['2014-10-03 15:59', '2014-10-03 15:59', '2014-10-03 16:00']),
+                                           [99.62, 99.62, 190.3],
+                                           pd.to_datetime(['2014-11-22', '2014-11-22', '2014-12-20']),
+                                           [95.0, 100.0, 190.0]], names=SurfaceFile.INDEX)
+        values = np.arange(24, dtype=float).reshape(3, 8)/7.0
+        return pd.DataFrame(values, index=index, columns=SurfaceFile.COLUMNS)
+
+    def test_stream_ivs(self):
+        frame = pd.concat([market_frame(), market_frame('2014-10-03 16:00:00')], ignore_index=True)
+        nonstandard = frame.iloc[:1].copy()
+        nonstandard['Symbol'] = 'AAPL7141122C00095000'
+        nonstandard['IsNonstandard'] = True
+        frame = pd.concat([frame.iloc[:4], nonstandard, frame.iloc[4:]], ignore_index=True)
+        path = os.path.join(self.dir, 'chain.csv')
+        frame.to_csv(path, index=False)
+        expected = os.path.join(self.dir, 'chain.ivs')
+        standard = frame[frame['IsNonstandard'] == False]
+        surface.ivs_chain(OptionChain.from_frame(standard), self.rate, self.pool).to_csv(expected, float_format='%.4f')
+        with open(expected) as f:
+            expected = f.read()
+        for chunk_rows in (1, 3, len(frame)):
+            out_path = os.path.join(self.dir, 'chain.%d.ivs' % chunk_rows)
+            written = surface.stream_ivs(path, out_path, self.rate, chunk_rows, self.pool)
+            self.assertEqual(written, 10)
+            with open(out_path) as f:
+                self.assertEqual(f.read(), expected)
+
+    def test_live_surface(self):
+        live = surface.LiveSurface(self.rate, amop_steps=50)
+        updates = []
+        live.subscribe(lambda delta, removed: updates.append((len(delta), removed)))
+        first = market_frame()
+        delta, removed = live.update(OptionChain.from_frame(first))
+        self.assertEqual((len(delta), removed), (5, []))
+        second = first[~first['Symbol'].str.startswith('AAPL141122C00105')].copy() # the 105 call is gone
+        second.loc[second['Symbol'] == 'SPY141220C00190000', 'Bid'] += 0.05
+        delta, removed = live.update(OptionChain.from_frame(second))
+        self.assertEqual(updates, [(5, []), (1, removed)])
+        self.assertEqual(list(delta.index.get_level_values('Strike')), [190.0])
+        expiry = int((np.datetime64('2014-11-22') - OptionChain.EPOCH).astype(int))
+        self.assertEqual(removed, [('AAPL', expiry, 105.0)])
+        self.assertEqual(live.warm.skipped, 3)
+        fresh = surface.LiveSurface(self.rate, amop_steps=50)
+        full, removed = fresh.update(OptionChain.from_frame(second))
+        self.assertTrue(full.index.equals(live.surface.index))
+        self.assertTrue(np.allclose(live.surface['IV'], full['IV'], atol=1e-3))
+        self.assertTrue(np.allclose(live.surface[['TV_c', 'TV_p']], full[['TV_c', 'TV_p']], atol=1e-3))
+
+    def test_surface_file_round_trip(self):
+        frame = self.surface_frame()
+        path = os.path.join(self.dir, 'x.ivb')
+        writer = SurfaceFile.SurfaceWriter(path, 0.01)
+        writer.append(frame.iloc[:2])
+        writer.append(frame.iloc[2:])
+        writer.close()
+        header, records = SurfaceFile.read_surface(path)
+        self.assertEqual(header['count'], 3)
+        self.assertEqual(header['symbols'], ['AAPL', 'SPY'])
+        self.assertEqual(header['rate'], 0.01)
+        self.assertEqual(np.datetime64(header['snapshot']), np.datetime64('2014-10-03T16:00'))
+        self.assertEqual(os.path.getsize(path), SurfaceFile.HEADER_BYTES + 3*SurfaceFile.SURFACE_DTYPE.itemsize
+                         + len('["AAPL", "SPY"]'))
+        back = SurfaceFile.to_frame(records).set_index(SurfaceFile.INDEX)
+        self.assertTrue(back.equals(frame))
+        csv_path = os.path.join(self.dir, 'x.ivs')
+        SurfaceFile.surface_to_csv(path, csv_path)
+        SurfaceFile.csv_to_surface(csv_path, os.path.join(self.dir, 'y.ivb'), 0.01)
+        header, again = SurfaceFile.read_surface(os.path.join(self.dir, 'y.ivb'))
+        self.assertTrue((again['Strike'] == records['Strike']).all())
+        self.assertTrue(np.allclose(again['IV'], records['IV'], atol=5e-5))
+        SurfaceFile.write_surface(path, frame.iloc[:0], 0.01)
+        self.assertEqual(len(SurfaceFile.read_surface(path)[1]), 0)
+
+    def test_surface_file_many_symbols(self):
+        n = 5000
+        index = pd.MultiIndex.from_arrays([['S%04d' % i for i in xrange(n)], pd.to_datetime(['2014-10-03 15:59']*n),
+                                           np.full(n, 100.0), pd.to_datetime(['2014-11-22']*n), np.full(n, 100.0)],
+                                          names=SurfaceFile.INDEX)
+        frame = pd.DataFrame(np.ones((n, 8)), index=index, columns=SurfaceFile.COLUMNS)
+        path = os.path.join(self.dir, 'x.ivb')
+        SurfaceFile.write_surface(path, frame, 0.01)
+        header, records = SurfaceFile.read_surface(path)
+        self.assertEqual(header['count'], n)
+        self.assertEqual(len(header['symbols']), n)
+        self.assertEqual(header['symbols'][-1], 'S%04d' % (n-1))
+        self.assertTrue((records['Sym'] == np.array(index.get_level_values('Sym'), dtype='S8')).all())
+
+    def test_surface_file_header(self):
+        path = os.path.join(self.dir, 'x.ivb')
+        SurfaceFile.write_surface(path, self.surface_frame(), 0.01)
+        with open(path, 'rb') as f:
+            data = f.read()
+        self.assertTrue(data.startswith(SurfaceFile.MAGIC))
+        with open(path, 'wb') as f:
+            f.write(data.replace(SurfaceFile.MAGIC, 'IVSURF9\n', 1))
+        self.assertRaisesRegexp(ValueError, 'unsupported version', SurfaceFile.read_header, path)
+        with open(path, 'wb') as f:
+            f.write('Sym,Quote_Time\n')
+        self.assertRaisesRegexp(ValueError, 'not a surface file', SurfaceFile.read_header, path)
+        with open(path, 'wb') as f:
+            f.write(data.replace('"<f8"', '"<f4"', 1))
+        self.assertRaises(ValueError, SurfaceFile.read_surface, path)
+
+    def test_render_surfaces(self):
+        tau = np.repeat([0.1, 0.2, 0.3], 4)
+        strike = np.tile([90.0, 95.0, 100.0, 105.0], 3)
+        df = pd.DataFrame({'Sym': ['AAPL']*12 + ['DEAD']*12, 'Tau': np.r_[tau, tau], 'Strike': np.r_[strike, strike],
+                           'IV': np.r_[0.2+0.001*(strike-100.0)**2, np.zeros(12)]})
+        self.assertTrue(plot3d.bin_surface(tau, strike, np.zeros(12)) is None)
+        taus, strikes, grid = plot3d.bin_surface(tau, strike, df['IV'][:12], tau_bins=3, strike_bins=4)
+        self.assertEqual(grid.shape, (3, 4))
+        self.assertTrue(np.isfinite(grid).all())
+        written = plot3d.render_surfaces(df, os.path.join(self.dir, 'img'), tau_bins=3, strike_bins=4)
+        self.assertEqual(written, [os.path.join(self.dir, 'img', 'AAPL.png')])
+        self.assertTrue(os.path.getsize(written[0]) > 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,74 @@
 #!/usr/bin/python
 
 import sys
+import numpy as np
 import pandas as pd
 
+# Column types of the tick files: 1 P(trade)/Q(quote), 4 trade price or quote
+# side B/A, 5 trade quantity or quote price, 6 quote size, 7 quote orders
+SCHEMA = {1: str, 2: str, 3: str, 4: str, 5: np.float64, 6: np.float64, 7: np.float64}
+
+def asof_index(times, quote_times, by=None, quote_by=None, tolerance=None, strict=False, offset=None):
+    """Row of the prevailing quote at every trade: the last quote at or before
+    (strictly before with strict) the trade time, of the same key. Quotes of
+    one time keep their file order, the last one prevails. Neither input
+    needs to be sorted; the search is a binary search over the quotes sorted
+    by (key, time).
+    @param times: trade times
+    @param quote_times: quote times
+    @param by: optional trade keys (e.g. symbols), matched to quote_by
+    @param quote_by: quote keys
+    @param tolerance: optional largest trade time - quote time of a match
+    @param strict: only quotes strictly before the trade
+    @param offset: optional per quote latency, added to quote_times
+    @return: int array of quote rows, -1 where there is no prevailing quote
+    """
+    times, quote_times = np.asarray(times), np.asarray(quote_times)
+    if (offset is not None):
+        quote_times = quote_times + offset
+    n = len(times)
+    if (len(quote_times) == 0):
+        return np.full(n, -1, dtype=np.int64)
+    if (by is None):
+        codes = np.zeros(n, dtype=np.int64)
+        quote_codes = np.zeros(len(quote_times), dtype=np.int64)
+    else:
+        codes = pd.factorize(np.concatenate((np.asarray(by), np.asarray(quote_by))))[0]
+        codes, quote_codes = codes[:n], codes[n:]
+    # dense ranks of the times, so (key, time) packs in one int64
+    stamps, rank = np.unique(np.concatenate((times, quote_times)), return_inverse=True)
+    key = codes*(len(stamps)+1) + rank[:n]
+    quote_key = quote_codes*(len(stamps)+1) + rank[n:]
+    order = np.argsort(quote_key, kind='mergesort')
+    pos = np.searchsorted(quote_key[order], key, side='left' if strict else 'right')-1
+    rows = order[np.maximum(pos, 0)]
+    found = (pos >= 0) & (quote_codes[rows] == codes)
+    if (tolerance is not None):
+        found &= (times - quote_times[rows]) <= tolerance
+    return np.where(found, rows, -1)
+
+def attach(frame, rows, source, columns, names=None):
+    """Add columns of the source rows to a frame, in place, NaN where rows is -1
+    (as from asof_index)
+    @param frame: frame with a row per element of rows
+    @param source: frame the rows index (by position)
+    @param columns: columns of source
+    @param names: names of the new columns, the source names by default
+    """
+    for column, name in zip(columns, names or columns):
+        frame[name] = np.append(np.asarray(source[column], dtype=float), np.nan)[rows] # -1 takes the NaN
+    return frame
+
 class TradeBook:
 
-    def build(self, d):
+    def build(self, d, last=None):
+        """Book of trades (mean price and total quantity per timestamp) and the
+        prevailing bid and ask, one row per timestamp (per quote when there are
+        several at one timestamp).
+        @param d: ticks, read with index_col=0 and header=None
+        @param last: last row of the book of the ticks before d, whose bid and ask 
+                     carry over (see build_stream)
+        """
         trade = d[d[1] == 'P']
         quote = d[d[1] == 'Q']
         bid = quote[quote[4] == 'B'][[5,6,7]]
@@ -17,7 +80,7 @@ class TradeBook:
         ba = bid_ask.fillna(method='ffill')
 
         trade[4] = trade[4].astype(float)
-        t = trade.iloc[:,(3,4)]
+        t = trade.iloc[:, [3, 4]]
         t.columns = ['tprice', 'tq']
         tgp = t.groupby(level=0)
 
@@ -26,19 +89,81 @@ class TradeBook:
         book = tr.join(ba, how="outer")
         book['tprice'] = book['tprice'].fillna(0)
         book['tq'] = book['tq'].fillna(0)
-        book = book.fillna(method='ffill')
+        if (last is not None):
+            book = pd.concat([last, book]).fillna(method='ffill').iloc[1:]
+        else:
+            book = book.fillna(method='ffill')
+
+        return book
 
+    def join_quotes(self, d, strict=False, tolerance=None, latency=None):
+        """Trades with the prevailing bid and ask of their symbol, one row per
+        trade. Unlike build(), no union of the trade and quote times is formed:
+        the quote of each side is found by asof_index and its columns attached.
+        @param d: ticks, read with index_col=0 and header=None
+        @param strict: only quotes strictly before the trade
+        @param tolerance: optional age limit of the quotes, in tick time units
+        @param latency: optional dict of venue -> delay of its quotes, in tick
+                        time units (venues not in it have none)
+        """
+        kind = d[1].values
+        trade = d[kind == 'P']
+        book = pd.DataFrame({'sym': trade[2].values, 'tprice': trade[4].astype(float).values,
+                             'tq': trade[5].values}, index=trade.index, columns=['sym', 'tprice', 'tq'])
+        for side, names in (('B', ['bprice', 'bsize', 'borders']), ('A', ['aprice', 'asize', 'aorders'])):
+            q = d[(kind == 'Q') & (d[4].values == side)]
+            offset = None if latency is None else q[3].map(latency).fillna(0).values
+            rows = asof_index(trade.index.values, q.index.values, trade[2].values, q[2].values,
+                              tolerance, strict, offset)
+            attach(book, rows, q, [5, 6, 7], names)
         return book
 
+    def build_stream(self, path, out_path, chunk_rows=1000000):
+        """build() for tick files larger than memory, writing the book as it goes.
+        The file is read chunk_rows rows at a time with the typed SCHEMA. The ticks
+        of the last timestamp of a chunk are held back for the next chunk, so every
+        timestamp is booked at once, and the last bid and ask carry over. Ticks 
+        must be in time order. The output is the csv of build() on the whole file.
+        @param path: tick csv
+        @param out_path: book csv to write
+        @param chunk_rows: rows read at a time
+        @return: number of book rows written
+        """
+        last = None
+        held = None
+        written = 0
+        with open(out_path, 'w') as out:
+            for chunk in pd.read_csv(path, index_col=0, header=None, dtype=SCHEMA, chunksize=chunk_rows):
+                if (held is not None):
+                    chunk = pd.concat([held, chunk])
+                stamps = chunk.index.values
+                earlier = np.flatnonzero(stamps != stamps[-1])
+                start = earlier[-1]+1 if len(earlier) else 0
+                held = chunk.iloc[start:]
+                if (start > 0):
+                    book = self.build(chunk.iloc[:start], last)
+                    book.to_csv(out, header=(last is None))
+                    last = book.iloc[-1:]
+                    written += len(book)
+            if (held is not None and len(held) > 0):
+                book = self.build(held, last)
+                book.to_csv(out, header=(last is None))
+                written += len(book)
+        return written
+
 
 if __name__ == '__main__':
 
     if (len(sys.argv) < 3):
-        print "Need 2 arugments! <arg1=input_file> <arg2=output_file>. Exiting..."
+        print "Need 2 arugments! <arg1=input_file> <arg2=output_file> [arg3=chunk_rows, to stream the input]. Exiting..."
         sys.exit()
 
     pd.options.mode.chained_assignment = None
 
+    if (len(sys.argv) > 3):
+        TradeBook().build_stream(sys.argv[1], sys.argv[2], int(sys.argv[3]))
+        sys.exit()
+
     d = pd.read_csv(sys.argv[1], index_col=0, header=None)
     tb = TradeBook()
     book = tb.build(d)
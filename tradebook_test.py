@@ -0,0 +1,67 @@
+#!/usr/bin/python
+
+import os
+import shutil
+import StringIO
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from tradeBook import SCHEMA, TradeBook, asof_index
+
+TICKS = """34200000,Q,XYZ,N,B,100.00,500,1
+34200000,Q,ABC,N,B,20.00,100,1
+34200002,Q,XYZ,P,B,100.01,200,2
+34200005,P,XYZ,N,100.02,100,,
+34200005,Q,XYZ,N,B,100.02,300,3
+34200006,P,ABC,N,20.01,100,,
+34200020,P,XYZ,N,100.02,100,,
+"""
+
+class TradeBookTest(unittest.TestCase):
+
+    def test_asof_index(self):
+        quotes = [1, 3, 3, 7]
+        self.assertEqual(list(asof_index([0, 1, 3, 5, 9], quotes)), [-1, 0, 2, 2, 3])
+        self.assertEqual(list(asof_index([0, 1, 3, 5, 9], quotes, strict=True)), [-1, -1, 0, 2, 3])
+        self.assertEqual(list(asof_index([5, 9], quotes, tolerance=1)), [-1, -1])
+        self.assertEqual(list(asof_index([5, 9], quotes, offset=[0, 0, 0, -3])), [3, 3])
+        self.assertEqual(list(asof_index([5, 5], quotes, ['a', 'b'], ['b', 'a', 'b', 'a'])), [1, 2])
+
+    def test_join_quotes(self):
+        d = pd.read_csv(StringIO.StringIO(TICKS), index_col=0, header=None, dtype=SCHEMA)
+        book = TradeBook().join_quotes(d)
+        self.assertEqual(list(book['sym']), ['XYZ', 'ABC', 'XYZ'])
+        self.assertEqual(list(book['bprice']), [100.02, 20.0, 100.02])
+        self.assertTrue(book['aprice'].isnull().all())
+        book = TradeBook().join_quotes(d, strict=True, tolerance=10)
+        self.assertEqual(list(book['bprice'][:2]), [100.01, 20.0])
+        self.assertTrue(np.isnan(book['bprice'].iloc[2]))
+        book = TradeBook().join_quotes(d, latency={'P': 4})
+        self.assertEqual(book['bsize'].iloc[0], 300)
+
+    def test_build_stream(self):
+        ticks = TICKS + """34200020,Q,XYZ,N,A,100.04,500,8
+34200021,Q,XYZ,N,A,100.03,900,6
+34200021,P,XYZ,N,100.03,200,,
+34200021,P,XYZ,N,100.04,300,,
+34200030,Q,XYZ,N,B,100.01,100,2
+"""
+        expected = TradeBook().build(pd.read_csv(StringIO.StringIO(ticks), index_col=0, header=None))
+        tmp = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp, 'ticks.csv')
+            with open(path, 'w') as f:
+                f.write(ticks)
+            for chunk_rows in (1, 7, 1000):
+                out_path = os.path.join(tmp, 'book.%d.csv' % chunk_rows)
+                written = TradeBook().build_stream(path, out_path, chunk_rows)
+                book = pd.read_csv(out_path, index_col=0)
+                self.assertEqual(written, len(expected))
+                self.assertTrue(book.equals(expected))
+        finally:
+            shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    unittest.main()